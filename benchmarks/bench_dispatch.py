@@ -0,0 +1,44 @@
+"""
+    benchmarks.bench_dispatch
+    =========================
+    Measures dispatching to endpoints (parameter collection, conversion,
+    invocation and output formatting) for varying parameter counts.
+
+    Usage: python benchmarks/bench_dispatch.py
+"""
+
+from common import measure, make_environ
+
+from east import East, JSON
+from east.app import Context
+
+
+PARAM_COUNTS = (0, 2, 5, 10)
+
+
+def make_endpoint(param_count):
+    """Create an endpoint with `param_count` integer parameters"""
+    namespace = {'JSON': JSON}
+    params = ', '.join('p%d: int = %d' % (i, i) for i in range(param_count))
+    exec('def endpoint(%s) -> JSON:\n    return None' % params, namespace)
+    return namespace['endpoint']
+
+
+def run():
+    results = []
+    for param_count in PARAM_COUNTS:
+        app = East('bench_dispatch')
+        app.configure(DEBUG=False, ACCESS_LOG=False)
+        app.register_route(make_endpoint(param_count), '/endpoint', ['GET'])
+
+        query_string = '&'.join('p%d=%d' % (i, i * 7) for i in range(0, param_count, 2))
+        context = Context(app, make_environ('/endpoint', query_string=query_string))
+        context.execute()
+
+        results.append(measure('dispatch.function', lambda: context.route.dispatch(context), params=param_count))
+    return results
+
+
+if __name__ == '__main__':
+    from run import print_results
+    print_results(run())
@@ -0,0 +1,41 @@
+"""
+    benchmarks.bench_headers
+    ========================
+    Measures `WSGIHeaders` construction and lookups with a realistic set of
+    browser, proxy and tracing headers.
+
+    Usage: python benchmarks/bench_headers.py
+"""
+
+from common import measure, make_environ, REALISTIC_HEADERS
+
+from east.structures import WSGIHeaders
+
+
+def run():
+    environ = make_environ('/', headers=REALISTIC_HEADERS)
+
+    def construct():
+        WSGIHeaders(environ)
+
+    def lookup_few():
+        headers = WSGIHeaders(environ)
+        headers.get('Authorization')
+        headers.get('Accept')
+        headers.get('X-Missing')
+
+    def iterate_all():
+        headers = WSGIHeaders(environ)
+        for key in headers:
+            headers[key]
+
+    return [
+        measure('headers.construct', construct, headers=len(REALISTIC_HEADERS)),
+        measure('headers.lookup_few', lookup_few, headers=len(REALISTIC_HEADERS)),
+        measure('headers.iterate_all', iterate_all, headers=len(REALISTIC_HEADERS)),
+    ]
+
+
+if __name__ == '__main__':
+    from run import print_results
+    print_results(run())
@@ -0,0 +1,32 @@
+"""
+    benchmarks.bench_json
+    =====================
+    Measures `JSON.format` on small and large payloads, in the compact
+    (production) and indented (DEBUG) modes.
+
+    Usage: python benchmarks/bench_json.py
+"""
+
+from common import measure
+
+from east.codecs import CodecRegistry
+from east.types import JSON
+
+
+SMALL_PAYLOAD = {'id': 42, 'title': 'Buy milk', 'done': False, 'tags': ['home', 'shopping']}
+LARGE_PAYLOAD = [dict(SMALL_PAYLOAD, id=i, description='x' * 100) for i in range(1000)]
+
+
+def run():
+    results = []
+    for indent in (None, 4):
+        formatter = JSON().bind(CodecRegistry(indent))
+        for name, payload in (('small', SMALL_PAYLOAD), ('large', LARGE_PAYLOAD)):
+            results.append(measure('json.format_%s' % name, lambda: formatter.format(payload),
+                                   number=2000 if name == 'small' else 50, indent=indent))
+    return results
+
+
+if __name__ == '__main__':
+    from run import print_results
+    print_results(run())
@@ -0,0 +1,85 @@
+"""
+    benchmarks.bench_memory
+    =======================
+    Measures memory allocated while serving a request, and garbage collector
+    activity under sustained load, with and without context pooling.
+
+    Usage: python benchmarks/bench_memory.py
+"""
+
+import gc
+import time
+import tracemalloc
+
+from common import make_environ, start_response, REALISTIC_HEADERS
+
+from bench_roundtrip import make_app
+
+
+REQUESTS = 20000
+TRACED_REQUESTS = 200
+POOL_SIZES = (0, 64)
+
+
+def measure_gc(name, f, number=REQUESTS, **params):
+    """Run `f` `number` times, counting GC collections and their pause time, then
+    trace the memory allocated at peak while running it"""
+    pauses = []
+
+    def on_collect(phase, info):
+        if phase == 'start':
+            pauses.append(time.perf_counter())
+        else:
+            pauses[-1] = time.perf_counter() - pauses[-1]
+
+    for _ in range(100):
+        f()
+    gc.collect()
+    collections_before = [stats['collections'] for stats in gc.get_stats()]
+    gc.callbacks.append(on_collect)
+    try:
+        started = time.perf_counter()
+        for _ in range(number):
+            f()
+        elapsed = time.perf_counter() - started
+    finally:
+        gc.callbacks.remove(on_collect)
+    collections = [stats['collections'] - before for stats, before in zip(gc.get_stats(), collections_before)]
+
+    tracemalloc.start()
+    peaks = []
+    for _ in range(TRACED_REQUESTS):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        f()
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+
+    return {
+        'name': name,
+        'params': params,
+        'mean_us': round(elapsed / number * 1e6, 3),
+        'gc_collections_per_1k': [round(count * 1000 / number, 2) for count in collections],
+        'gc_pause_us_per_request': round(sum(pauses) / number * 1e6, 3),
+        'gc_max_pause_us': round(max(pauses, default=0) * 1e6, 3),
+        'peak_bytes_per_request': sorted(peaks)[len(peaks) // 2],
+    }
+
+
+def run():
+    results = []
+    for pool_size in POOL_SIZES:
+        app = make_app()
+        app.configure(CONTEXT_POOL_SIZE=pool_size)
+
+        def request():
+            environ = make_environ('/todos/7', headers=REALISTIC_HEADERS)
+            b''.join(app.application(environ, start_response))
+
+        results.append(measure_gc('memory.resource_get', request, pool=pool_size))
+    return results
+
+
+if __name__ == '__main__':
+    from run import print_results
+    print_results(run())
@@ -0,0 +1,54 @@
+"""
+    benchmarks.bench_roundtrip
+    ==========================
+    Measures full request round-trips through `East.application`, for
+    function and `Resource` routes, including a 404.
+
+    Usage: python benchmarks/bench_roundtrip.py
+"""
+
+from common import measure, make_environ, start_response, REALISTIC_HEADERS
+
+from east import East, JSON, Resource
+
+
+def make_app():
+    app = East('bench_roundtrip')
+    app.configure(DEBUG=False, ACCESS_LOG=False)
+
+    @app.route('/todos', methods=['GET'])
+    def list_todos(limit: int = 10) -> JSON:
+        return [{'id': i, 'task': 'Task %d' % i} for i in range(limit)]
+
+    @app.resource('/todos/<int:todo_id>')
+    class Todo(Resource):
+        def get(self, todo_id: int) -> JSON:
+            return {'id': todo_id, 'task': 'Task %d' % todo_id}
+
+        def put(self, todo_id: int, task: str) -> JSON:
+            return {'id': todo_id, 'task': task}
+
+    return app
+
+
+def run():
+    app = make_app()
+
+    def request(path, method='GET', **kwargs):
+        def call():
+            environ = make_environ(path, method, headers=REALISTIC_HEADERS, **kwargs)
+            b''.join(app.application(environ, start_response))
+        return call
+
+    return [
+        measure('roundtrip.function', request('/todos', query_string='limit=5')),
+        measure('roundtrip.resource_get', request('/todos/7')),
+        measure('roundtrip.resource_put', request('/todos/7', 'PUT', body=b'{"task": "Buy milk"}',
+                                                  content_type='application/json')),
+        measure('roundtrip.not_found', request('/missing')),
+    ]
+
+
+if __name__ == '__main__':
+    from run import print_results
+    print_results(run())
@@ -0,0 +1,56 @@
+"""
+    benchmarks.bench_routing
+    ========================
+    Measures `Router.match` time for growing numbers of static and
+    parameterized routes. Match time should stay flat as routes are added.
+
+    Usage: python benchmarks/bench_routing.py
+"""
+
+from common import measure
+
+from east.routing import Router
+from east.types import JSON
+
+
+ROUTE_COUNTS = (10, 100, 1000, 5000)
+
+
+def list_endpoint() -> JSON:
+    return []
+
+
+def detail_endpoint(item_id: int) -> JSON:
+    return {'id': item_id}
+
+
+def make_router(route_count, cache_size=None):
+    """Build a router with a realistic mix of static and parameterized routes"""
+    router = Router(cache_size=cache_size)
+    for i in range(route_count):
+        if i % 2:
+            router.add_route(detail_endpoint, '/api/resource%d/<int:item_id>/details' % i, ['GET'])
+        else:
+            router.add_route(list_endpoint, '/api/resource%d/list' % i, ['GET', 'POST'])
+    return router
+
+
+def run():
+    results = []
+    for route_count in ROUTE_COUNTS:
+        router, cached_router = make_router(route_count), make_router(route_count, cache_size=1024)
+        last_static, last_param = (route_count - 2) // 2 * 2, (route_count - 1) // 2 * 2 + 1
+        static_url, param_url = '/api/resource%d/list' % last_static, '/api/resource%d/42/details' % last_param
+
+        results += [
+            measure('routing.static_first', lambda: router.match('/api/resource0/list', 'GET'), routes=route_count),
+            measure('routing.static_last', lambda: router.match(static_url, 'GET'), routes=route_count),
+            measure('routing.param_last', lambda: router.match(param_url, 'GET'), routes=route_count),
+            measure('routing.param_last_cached', lambda: cached_router.match(param_url, 'GET'), routes=route_count),
+        ]
+    return results
+
+
+if __name__ == '__main__':
+    from run import print_results
+    print_results(run())
@@ -0,0 +1,107 @@
+"""
+    benchmarks.run
+    ==============
+    Runs the request hot path benchmark suite and emits the results as JSON,
+    optionally comparing them with the results of a previous run.
+
+    Usage: python benchmarks/run.py [--output results.json] [--compare previous.json] [suite ...]
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+import bench_dispatch
+import bench_headers
+import bench_json
+import bench_memory
+import bench_roundtrip
+import bench_routing
+
+
+SUITES = {
+    'routing': bench_routing,
+    'dispatch': bench_dispatch,
+    'headers': bench_headers,
+    'json': bench_json,
+    'roundtrip': bench_roundtrip,
+    'memory': bench_memory,
+}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=sys.path[0]).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(result):
+    return result['name'], json.dumps(result['params'], sort_keys=True)
+
+
+def print_results(results, previous=None):
+    previous = {result_key(r): r for r in (previous or [])}
+    print('%-32s %-24s %12s %12s %12s %10s' % ('benchmark', 'params', 'mean us', 'p50 us', 'p99 us', 'p99 diff'),
+          file=sys.stderr)
+    for result in results:
+        if 'p99_us' not in result:
+            print_gc_result(result)
+            continue
+        before = previous.get(result_key(result))
+        change = '%+9.1f%%' % ((result['p99_us'] / before['p99_us'] - 1) * 100) if before else ''
+        params = ','.join('%s=%s' % item for item in result['params'].items())
+        print('%-32s %-24s %12.3f %12.3f %12.3f %10s' % (result['name'], params, result['mean_us'],
+                                                         result['p50_us'], result['p99_us'], change),
+              file=sys.stderr)
+
+
+def print_gc_result(result):
+    params = ','.join('%s=%s' % item for item in result['params'].items())
+    print('%-32s %-24s %12.3f  peak %d B/request, gc/1k %s, pause %.3f us/request, max %.1f us' % (
+        result['name'], params, result['mean_us'], result['peak_bytes_per_request'],
+        result['gc_collections_per_1k'], result['gc_pause_us_per_request'], result['gc_max_pause_us']),
+        file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='East request hot path benchmarks')
+    parser.add_argument('suites', nargs='*', metavar='suite', help='one of %s (default: all)' % ', '.join(SUITES))
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare against')
+    args = parser.parse_args()
+    for name in args.suites:
+        if name not in SUITES:
+            parser.error('unknown suite: %s' % name)
+
+    results = []
+    for name in args.suites or SUITES:
+        results += SUITES[name].run()
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'results': results,
+    }
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)['results']
+    print_results(results, previous)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+
+if __name__ == '__main__':
+    main()
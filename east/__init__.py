@@ -1,5 +1,5 @@
 from .app import East
 from .exceptions import *
-from .types import JSON, Str, Nothing
+from .types import JSON, JSONLines, Str, Nothing, File
 from .http import Request, Response
 from .routing import Resource
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""
+    east.accesslog
+    ==============
+    Non-blocking, structured (JSON lines) access logging
+
+    :copyright: (c) 2016 by Zvonimir Jurelinac
+    :license: MIT
+"""
+
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+
+
+class AccessLog:
+    """Access log writing one JSON object per request
+
+    Records are put on a bounded queue and formatted and written by a
+    background thread, so request serving never blocks on the output stream;
+    if the queue is full, records are dropped and counted in `dropped`.
+    Nothing at all is done when the `logger` is not enabled for INFO.
+
+    Only a `sample_rate` fraction of regular requests is logged, while slow
+    (taking at least `slow_threshold` seconds) and errored (5xx) requests are
+    always logged. With `only_slow_or_errors`, regular requests are skipped.
+    """
+
+    def __init__(self, logger, stream=None, sample_rate=1.0, slow_threshold=None, only_slow_or_errors=False,
+                 queue_size=10000):
+        self.logger = logger
+        self.stream = stream
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.only_slow_or_errors = only_slow_or_errors
+        self.dropped = 0
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def log(self, method, path, status, duration, route=None, request_bytes=None, response_bytes=None,
+            remote_addr=None):
+        """Log a served request, `duration` being in seconds"""
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+
+        notable = status >= 500 or (self.slow_threshold is not None and duration >= self.slow_threshold)
+        if not notable and (self.only_slow_or_errors or
+                            (self.sample_rate < 1.0 and random.random() >= self.sample_rate)):
+            return
+
+        if self._writer is None:
+            self.start()
+        try:
+            self._queue.put_nowait((time.time(), method, path, status, duration, route, request_bytes,
+                                    response_bytes, remote_addr))
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self):
+        """Start the background writer thread"""
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write, name='%s-writer' % self.logger.name, daemon=True)
+                self._writer.start()
+                atexit.register(self.close)
+
+    def close(self):
+        """Write out all queued records and stop the writer thread"""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+
+    def _write(self):
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            stream = self.stream or sys.stdout
+            stream.write(format_record(record))
+            if self._queue.empty():
+                stream.flush()
+
+
+def format_record(record):
+    timestamp, method, path, status, duration, route, request_bytes, response_bytes, remote_addr = record
+    return json.dumps({
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(timestamp)) + '.%03dZ' % (timestamp % 1 * 1000),
+        'method': method,
+        'path': path,
+        'route': route,
+        'status': status,
+        'duration_ms': round(duration * 1000, 3),
+        'request_bytes': request_bytes,
+        'response_bytes': response_bytes,
+        'remote_addr': remote_addr,
+    }, separators=(',', ':')) + '\n'
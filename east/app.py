@@ -6,49 +6,112 @@
 
 import logging
 import sys
+
+from time import perf_counter
 # import traceback
 
 from abc import ABCMeta, abstractmethod
 from collections import defaultdict
-
-from east.http import Request
-from east.routing import Router, Resource, dispatch_to_endpoint
+from concurrent.futures import ThreadPoolExecutor
+
+from east.accesslog import AccessLog
+from east.batch import BatchHandler, MAX_BATCH_REQUESTS
+from east.codecs import CodecRegistry
+from east.compression import Compressor
+from east.concurrency import resolve, run_in_executor, run_sync
+from east.metrics import Metrics, PrometheusText, PHASES
+from east.profiling import Profiler, TRIGGER_HEADER
+from east.http import Request, PendingASGIBody, SentBytesCounter, make_environ, read_asgi_body, \
+    MAX_REQUEST_BODY_SIZE, ASYNC_PARSE_SIZE
+from east.routing import Router, BODY_METHODS
+from east.server import serve
+from east.structures import ObjectPool
+from east.types import JSON, Str
 from east.exceptions import *
 
 
+ENDPOINT_EVENTS = ('endpoint_determined', 'response_created')
+
+
 class East:
     """Application object
 
-    Provides WSGI interface, routing, configurations, event management and
-    error handling.
+    Provides WSGI and ASGI interfaces, routing, configurations, event
+    management and error handling.
     """
 
     def __init__(self, name):
         self.name = name
 
-        self._router = Router()
         self._config = self.make_config()
+        self._codecs = CodecRegistry()
+        self._router = Router(cache_size=self.config.get('ROUTE_CACHE_SIZE'))
         self._logger = self.make_logger()
+        self._access_log = AccessLog(logging.getLogger(self.name + '.access'))
         self._ext = {}
         self._hooks = defaultdict(list)
+        self._endpoint_hooks = defaultdict(lambda: defaultdict(list))
+        self._pipeline = {}
+        self._endpoint_pipelines = {}
         self._exception_handlers = {}
-
+        self._handler_cache = {}
+        self._executor = None
+        self._compressor = None
+        self._metrics = None
+        self._profiler = None
+        self._context_pool = None
+        self._batch = None
+
+        self.configure()
         self.logger.info('App `%s` initialized' % self.name)
         self.logger.warning('Config not properly implemented yet!')
 
     # Routing, customization and extension points
 
-    def register_route(self, f, url_rule, methods):
-        """Register a view function/method for a given URL rule"""
-        self._router.add_route(f, url_rule, methods)
-
-    def register_hook(self, event, f):
-        """Register a function which will be executed upon firing of the event"""
-        self._hooks[event].append(f)
+    def register_route(self, f, url_rule, methods, **options):
+        """Register a view function/method for a given URL rule
+
+        Supported options are `max_body_size`, overriding the application-wide
+        request body size limit for the route, and `coalesce`, making identical
+        concurrent GET requests share a single dispatch of the endpoint. Requests
+        are identical if their URL and query string match, as well as the values
+        of the headers listed in `coalesce`, if it is a list of header names.
+        """
+        self._router.add_route(f, url_rule, methods, codecs=self._codecs, **options)
+
+    def register_hook(self, event, f, endpoint=None):
+        """Register a function which will be executed upon firing of the event
+
+        If `endpoint` is given, the hook only runs for requests routed to it,
+        which is possible for events fired once the endpoint is determined.
+        """
+        if endpoint is None:
+            self._hooks[event].append(f)
+        elif event in ENDPOINT_EVENTS:
+            self._endpoint_hooks[endpoint][event].append(f)
+        else:
+            raise ValueError('Event `%s` is fired before the endpoint is determined' % event)
+        self.compile_hooks()
+
+    def compile_hooks(self):
+        """Freeze registered hooks into per-event tuples, global ones and for each
+        endpoint with its own hooks, leaving out events without hooks"""
+        self._pipeline = {event: tuple(hooks) for event, hooks in self._hooks.items() if hooks}
+        self._endpoint_pipelines = {
+            endpoint: dict(self._pipeline, **{event: self._pipeline.get(event, ()) + tuple(hooks)
+                                              for event, hooks in endpoint_hooks.items() if hooks})
+            for endpoint, endpoint_hooks in self._endpoint_hooks.items()
+        }
 
     def register_errorhandler(self, exception, f):
         """Register an error handler for a specific exception"""
         self._exception_handlers[exception] = f
+        self._handler_cache.clear()
+
+    def register_codec(self, content_type, encode=None, decode=None):
+        """Register an encoder and/or decoder for request and response bodies
+        of the given content type"""
+        self._codecs.register(content_type, encode, decode)
 
     def register_extension(self, extension, name=None):
         """"""
@@ -60,24 +123,24 @@ class East:
 
     # Decorators
 
-    def route(self, url_rule, methods=['GET']):
+    def route(self, url_rule, methods=['GET'], **options):
         """Decorator for registering view functions for an URL"""
         def decorator(f):
-            self.register_route(f, url_rule, methods)
+            self.register_route(f, url_rule, methods, **options)
             return f
         return decorator
 
-    def resource(self, url_rule):
+    def resource(self, url_rule, **options):
         """Decorator for registering resources for an URL"""
         def decorator(cls):
-            self.register_route(cls, url_rule, None)
+            self.register_route(cls, url_rule, None, **options)
             return cls
         return decorator
 
-    def event_hook(self, event):
+    def event_hook(self, event, endpoint=None):
         """Decorator for registering hooks for specific events"""
         def decorator(f):
-            self.register_hook(event, f)
+            self.register_hook(event, f, endpoint)
             return f
         return decorator
 
@@ -91,25 +154,110 @@ class East:
     # Configuring, testing, debugging and logging
 
     def make_config(self):
-        config = {'DEBUG': True}
+        config = {'DEBUG': True, 'ROUTE_CACHE_SIZE': 1024, 'THREAD_POOL_SIZE': None,
+                  'MAX_REQUEST_BODY_SIZE': MAX_REQUEST_BODY_SIZE, 'COMPRESSION': False,
+                  'COMPRESSION_MIN_SIZE': 1024, 'COMPRESSION_LEVELS': {}, 'COMPRESSION_DEFAULT_LEVEL': 6,
+                  'ACCESS_LOG': True, 'ACCESS_LOG_STREAM': None, 'ACCESS_LOG_SAMPLE_RATE': 1.0,
+                  'ACCESS_LOG_SLOW_THRESHOLD': None, 'ACCESS_LOG_ONLY_SLOW_OR_ERRORS': False,
+                  'METRICS': False, 'METRICS_ENDPOINT': None, 'PROFILING': False, 'PROFILING_SAMPLE_RATE': 0.0,
+                  'PROFILING_SECRET': None, 'PROFILING_TRIGGER_HEADER': TRIGGER_HEADER,
+                  'PROFILING_DIRECTORY': None, 'PROFILING_ENDPOINT': None, 'WORKERS': 1, 'WORKER_MAX_REQUESTS': None,
+                  'WORKER_MAX_MEMORY': None, 'GRACEFUL_TIMEOUT': 30, 'REUSE_PORT': False, 'CONTEXT_POOL_SIZE': 0,
+                  'BATCH_ENDPOINT': None, 'BATCH_MAX_REQUESTS': MAX_BATCH_REQUESTS}
         return config
 
+    def configure(self, **options):
+        """Update configuration values and the components depending on them"""
+        self._config.update(options)
+        self._codecs.indent = 4 if self.config.get('DEBUG') else None
+        self._logger.setLevel(logging.DEBUG if self.config.get('DEBUG') else logging.ERROR)
+        self.configure_access_log()
+        self._compressor = Compressor(self.config.get('COMPRESSION_MIN_SIZE'), self.config.get('COMPRESSION_LEVELS'),
+                                      self.config.get('COMPRESSION_DEFAULT_LEVEL')) \
+            if self.config.get('COMPRESSION') else None
+        if self.config.get('METRICS') and self._metrics is None:
+            self.enable_metrics(self.config.get('METRICS_ENDPOINT'))
+        if self.config.get('PROFILING') and self._profiler is None:
+            self.enable_profiling(self.config.get('PROFILING_ENDPOINT'))
+        if self._profiler is not None:
+            self.configure_profiler()
+        if self.config.get('BATCH_ENDPOINT') and self._batch is None:
+            self.enable_batch(self.config.get('BATCH_ENDPOINT'))
+        if self._batch is not None:
+            self._batch.max_requests = self.config.get('BATCH_MAX_REQUESTS')
+        # Pooled contexts (and their requests) must not be used after the request is served
+        self._context_pool = ObjectPool(Context, self.config.get('CONTEXT_POOL_SIZE')) \
+            if self.config.get('CONTEXT_POOL_SIZE') else None
+
+    def enable_metrics(self, url_rule=None):
+        """Start collecting request metrics, optionally exposing them in the
+        Prometheus text format at `url_rule`"""
+        if self._metrics is None:
+            self._metrics = Metrics()
+
+        if url_rule is not None:
+            def metrics_endpoint() -> PrometheusText:
+                return self._metrics.render_prometheus()
+            self.register_route(metrics_endpoint, url_rule, ['GET'])
+
+    def enable_profiling(self, url_rule=None):
+        """Start profiling sampled or triggered requests, optionally exposing
+        the per-route stats at `url_rule`
+
+        The stats endpoint requires the profiling secret in the trigger header.
+        """
+        if self._profiler is None:
+            self._profiler = Profiler()
+            self.configure_profiler()
+
+        if url_rule is not None:
+            def profiling_endpoint(route: str = '', limit: int = 30) -> Str:
+                return self._profiler.report(route or None, limit)
+
+            def authorize(context):
+                if not self._profiler.is_authorized(context.environ):
+                    raise HTTPNotFound('Requested URL was not found on this server')
+
+            self.register_route(profiling_endpoint, url_rule, ['GET'])
+            self.register_hook('endpoint_determined', authorize, profiling_endpoint)
+
+    def enable_batch(self, url_rule):
+        """Serve batch requests, JSON arrays of `{method, path, args, body}`
+        sub-requests, POSTed to `url_rule`"""
+        if self._batch is None:
+            self._batch = BatchHandler(self, self.config.get('BATCH_MAX_REQUESTS'))
+
+        def batch_endpoint() -> JSON:
+            """Never called, the response is provided by the batch handler hook"""
+        self.register_route(batch_endpoint, url_rule, ['POST'])
+        self.register_hook('endpoint_determined', self._batch, batch_endpoint)
+
     def make_logger(self):
         level = logging.DEBUG if self.config.get('DEBUG') else logging.ERROR
 
         logger = logging.getLogger(self.name)
         logger.setLevel(level)
 
-        handler = logging.StreamHandler(sys.stdout)
-        handler.setLevel(level)
+        if not logger.handlers:
+            handler = logging.StreamHandler(sys.stdout)
 
-        formatter = logging.Formatter('%(asctime)s | %(levelname)-9s| %(name)-20s :: %(message)s', '%d/%m/%Y %H:%M:%S')
+            formatter = logging.Formatter('%(asctime)s | %(levelname)-9s| %(name)-20s :: %(message)s',
+                                          '%d/%m/%Y %H:%M:%S')
 
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
 
         return logger
 
+    def configure_access_log(self):
+        access_log = self._access_log
+        access_log.logger.setLevel(logging.INFO if self.config.get('ACCESS_LOG') else logging.WARNING)
+        access_log.logger.propagate = False
+        access_log.stream = self.config.get('ACCESS_LOG_STREAM')
+        access_log.sample_rate = self.config.get('ACCESS_LOG_SAMPLE_RATE')
+        access_log.slow_threshold = self.config.get('ACCESS_LOG_SLOW_THRESHOLD')
+        access_log.only_slow_or_errors = self.config.get('ACCESS_LOG_ONLY_SLOW_OR_ERRORS')
+
     @property
     def config(self):
         return self._config
@@ -118,57 +266,249 @@ class East:
     def logger(self):
         return self._logger
 
-    def run(self, host, port=8000):
-        try:
-            from gevent.pywsgi import WSGIServer
-        except ImportError:
-            self.logger.log('Could not find gevent package, aborting')
-            sys.exit(1)
+    @property
+    def access_log(self):
+        return self._access_log
 
-        server = WSGIServer((host, port), self, log=self.logger)
+    @property
+    def metrics(self):
+        return self._metrics
 
-        try:
-            server.serve_forever()
-        except KeyboardInterrupt:
-            self.logger.info('Shutting down... Bye bye!')
-            server.stop()
+    def configure_profiler(self):
+        profiler = self._profiler
+        profiler.sample_rate = self.config.get('PROFILING_SAMPLE_RATE')
+        profiler.secret = self.config.get('PROFILING_SECRET')
+        profiler.trigger_header = self.config.get('PROFILING_TRIGGER_HEADER')
+        profiler.directory = self.config.get('PROFILING_DIRECTORY')
+
+    @property
+    def profiler(self):
+        return self._profiler
+
+    @property
+    def router(self):
+        return self._router
+
+    @property
+    def codecs(self):
+        return self._codecs
+
+    @property
+    def compressor(self):
+        return self._compressor
+
+    @property
+    def executor(self):
+        """Thread pool used for running synchronous endpoints under ASGI"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.config.get('THREAD_POOL_SIZE'),
+                                                thread_name_prefix=self.name)
+        return self._executor
+
+    def run(self, host='127.0.0.1', port=8000, workers=None):
+        """Serve the app over HTTP with gevent, or the standard library server
+        if gevent is not installed
+
+        With more than one worker (`WORKERS` by default), or worker recycling
+        configured by `WORKER_MAX_REQUESTS` or `WORKER_MAX_MEMORY` (in bytes),
+        a master process forks and supervises the workers. SIGTERM shuts down
+        gracefully, letting in-flight requests finish within `GRACEFUL_TIMEOUT`.
+        """
+        serve(self, host, port, workers or self.config.get('WORKERS'), self.config.get('WORKER_MAX_REQUESTS'),
+              self.config.get('WORKER_MAX_MEMORY'), self.config.get('GRACEFUL_TIMEOUT'),
+              self.config.get('REUSE_PORT'))
+
+    def close(self):
+        """Release the resources held by the app: the thread pool and the access log writer"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._access_log.close()
 
     # Execution methods
 
+    def find_handler(self, exc_class):
+        """Return the handler registered for the closest class in the exception
+        class MRO, or None; the result is memoized per exception class"""
+        try:
+            return self._handler_cache[exc_class]
+        except KeyError:
+            handler = next((self._exception_handlers[cls] for cls in exc_class.__mro__
+                            if cls in self._exception_handlers), None)
+            self._handler_cache[exc_class] = handler
+            return handler
+
     def dispatch_to_handler(self, exception):
         """Dispatch caught exception to it's registered handler"""
-        for exc_class, exc_handler in self._exception_handlers.items():
-            if isinstance(exception, exc_class):
-                return exc_handler(exception)
-        return None
+        handler = self.find_handler(type(exception))
+        return handler(exception) if handler is not None else None
+
+    def exception_response(self, exception):
+        """Default error response, for exceptions without a handler (or whose
+        handler returned nothing)"""
+        if not isinstance(exception, HTTPBaseException):
+            exception = HTTPBaseException(str(exception), name=exception.__class__.__name__)
+        return exception.as_response(self._codecs)
+
+    def hooks_for(self, endpoint):
+        """Return compiled hooks applying to requests for the endpoint"""
+        return self._endpoint_pipelines.get(endpoint, self._pipeline)
 
     def trigger_event(self, event, context):
         """Activate all hooks listening to the event"""
-        for hook in self._hooks[event]:
-            hook(context)
-
-    def application(self, environ, start_response):
-        """The WSGI application"""
+        for hook in self.hooks_for(context.endpoint).get(event, ()):
+            run_sync(hook(context))
+
+    def handle_request(self, environ):
+        """Process a single request, returning the response"""
+        started = perf_counter()
+        context, response = None, None
+        if self._metrics is not None:
+            self._metrics.request_started()
+        try:
+            context = self.make_context(environ)
+            if self._profiler is not None and self._profiler.should_profile(environ):
+                response, status, exception = self._profiler.profile(context)
+            else:
+                response, status, exception = context.execute()
+            if status == Context.ERROR:
+                response = run_sync(self.dispatch_to_handler(exception)) or self.exception_response(exception)
+        except Exception as e:
+            self.logger.exception('Caught exception during request serving (with traceback):')
+            response = HTTPBaseException(str(e), name=e.__class__.__name__).as_response(self._codecs)
+        finally:
+            self.log_request(environ, context, response, perf_counter() - started)
+            if self._context_pool is not None and context is not None:
+                self._context_pool.release(context)
+            return response
+
+    async def handle_request_async(self, environ):
+        """Asynchronous counterpart of `handle_request`"""
+        started = perf_counter()
+        context, response = None, None
+        if self._metrics is not None:
+            self._metrics.request_started()
         try:
-            context = Context(self, environ)
-            response, status, exception = context.execute()
+            context = self.make_context(environ)
+            if self._profiler is not None and self._profiler.should_profile(environ):
+                response, status, exception = await self._profiler.profile_async(context)
+            else:
+                response, status, exception = await context.execute_async()
             if status == Context.ERROR:
-                response = self.dispatch_to_handler(exception) or exception.as_response()
+                response = await resolve(self.dispatch_to_handler(exception)) or self.exception_response(exception)
         except Exception as e:
             self.logger.exception('Caught exception during request serving (with traceback):')
-            response = HTTPBaseException(str(e), name=e.__class__.__name__).as_response()
+            response = HTTPBaseException(str(e), name=e.__class__.__name__).as_response(self._codecs)
         finally:
-            self.logger.info('%s %s :: %s' % (context.request.method, context.request.url, response.status_message))
-            start_response(response.status_message, response.headers.as_list())
-            return [response.body]
+            self.log_request(environ, context, response, perf_counter() - started)
+            if self._context_pool is not None and context is not None:
+                self._context_pool.release(context)
+            return response
+
+    def make_context(self, environ):
+        """Create the request context, or reuse a pooled one if pooling is enabled"""
+        if self._context_pool is not None:
+            return self._context_pool.acquire(self, environ)
+        return Context(self, environ)
+
+    def log_request(self, environ, context, response, duration):
+        """Pass the served request to the access log and metrics; streamed
+        responses are recorded once their body is sent, with the bytes sent"""
+        route = context.route.url_rule if context is not None and context.route is not None else None
+        timings = context.timings if context is not None else None
+        if response.content_length is None:
+            response.body = SentBytesCounter(response.body, lambda sent: self.record_request(
+                environ, route, response.status, duration, timings, sent))
+        else:
+            self.record_request(environ, route, response.status, duration, timings, response.content_length)
+
+    def record_request(self, environ, route, status, duration, timings, response_bytes):
+        request_bytes = int(environ.get('CONTENT_LENGTH') or 0)
+        self._access_log.log(environ.get('REQUEST_METHOD'), environ.get('PATH_INFO'), status, duration,
+                             route, request_bytes, response_bytes, environ.get('REMOTE_ADDR'))
+        if self._metrics is not None:
+            self._metrics.record(route, environ.get('REQUEST_METHOD'), status, duration, timings,
+                                 request_bytes, response_bytes)
 
-    def __call__(self, environ, start_response):
-        """Shortcut for method self.application"""
-        return self.application(environ, start_response)
+    def application(self, environ, start_response):
+        """The WSGI application"""
+        response = self.handle_request(environ)
+        start_response(response.status_message, response.headers.as_list())
+        return response.wsgi_body(environ)
+
+    async def asgi_application(self, scope, receive, send):
+        """The ASGI 3 application"""
+        if scope['type'] == 'lifespan':
+            return await self.asgi_lifespan(receive, send)
+        if scope['type'] == 'websocket':
+            return await self.asgi_reject_websocket(receive, send)
+        if scope['type'] != 'http':
+            self.logger.warning('Ignoring unsupported ASGI connection of type `%s`' % scope['type'])
+            return
+
+        environ = make_environ(scope, PendingASGIBody(receive))
+        try:
+            response = await self.handle_request_async(environ)
+            await self.send_asgi_response(response, send)
+        finally:
+            environ['wsgi.input'].close()
+
+    async def send_asgi_response(self, response, send):
+        """Send the response over ASGI, pulling streamed bodies chunk by chunk
+        in the executor so slow generators do not block the event loop"""
+        await send({'type': 'http.response.start', 'status': response.status,
+                    'headers': [(k.encode('latin-1'), v.encode('latin-1')) for k, v in response.headers.as_list()]})
+
+        if not response.streamed:
+            await send({'type': 'http.response.body', 'body': next(response.iter_body())})
+            return
+
+        chunks = response.iter_body()
+        try:
+            while True:
+                chunk = await run_in_executor(self.executor, next, chunks, None)
+                if chunk is None:
+                    break
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            response.close()
+
+    async def asgi_lifespan(self, receive, send):
+        """Handle ASGI lifespan events, shutting down the thread pool on exit"""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                try:
+                    self.close()
+                except Exception as e:
+                    self.logger.exception('Caught exception during shutdown:')
+                    await send({'type': 'lifespan.shutdown.failed', 'message': str(e)})
+                else:
+                    await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def asgi_reject_websocket(self, receive, send):
+        """Reject a WebSocket connection, which the server answers with 403 Forbidden"""
+        message = await receive()
+        if message['type'] == 'websocket.connect':
+            await send({'type': 'websocket.close', 'code': 1008})
+
+    def __call__(self, *args):
+        """Shortcut for method self.application, or self.asgi_application if
+        called with the ASGI (scope, receive, send) signature"""
+        if len(args) == 3:
+            return self.asgi_application(*args)
+        return self.application(*args)
 
 
 class Context:
     """Request-serving context, wraps processing of a single request"""
+    __slots__ = ('environ', 'request', 'route', 'endpoint', 'response', 'exception', 'error_stream', 'config',
+                 'codecs', 'logger', 'hooks', 'hooks_for', 'resolve_route', 'executor', 'compressor', 'timings',
+                 'status', 'claims', '_data', '_spare_request')
 
     CREATED = 0
     FINISHED = 1
@@ -177,64 +517,213 @@ class Context:
     def __init__(self, app, environ):
         self.environ = environ
         self.request = None
+        self.route = None
         self.endpoint = None
         self.response = None
         self.exception = None
+        self.claims = None
 
         self.error_stream = environ['wsgi.errors']
 
         self.config = app.config
-        self.data = DataStorage()
+        self.codecs = app.codecs
         self.logger = app.logger
+        self._data = None
+        self._spare_request = None
 
-        self.trigger_event = app.trigger_event
-        self.match_route = app._router.match
+        self.hooks = app.hooks_for(None)
+        self.hooks_for = app.hooks_for
+        self.resolve_route = app._router.resolve
+        self.executor = app.executor
+        self.compressor = app.compressor
+        self.timings = dict.fromkeys(PHASES, 0.0) if app.metrics is not None else None
 
         self.status = Context.CREATED
 
+    def reuse(self, app, environ):
+        """Reset the context to serve a new request, keeping its request object for reuse"""
+        request = self.request
+        self.__init__(app, environ)
+        self._spare_request = request
+        return self
+
+    @property
+    def data(self):
+        """Request-scoped storage for hooks and extensions, created on first access"""
+        if self._data is None:
+            self._data = DataStorage()
+        return self._data
+
+    def make_request(self):
+        """Create the request from the environ, reusing the spare request of a pooled context"""
+        max_body_size = self.config.get('MAX_REQUEST_BODY_SIZE')
+        if self._spare_request is not None:
+            request, self._spare_request = self._spare_request, None
+            return request.reuse(self.environ, max_body_size, self.codecs)
+        return Request.parse_request(self.environ, max_body_size, self.codecs)
+
     def execute(self):
         """Execute request processing and content generation, all inside
         the current context"""
         try:
-            self.trigger_event('context_created', self)
+            self.trigger_event('context_created')
 
-            self.request = Request.parse_request(self.environ)
-            self.trigger_event('request_received', self)
+            started = perf_counter()
+            self.request = self.make_request()
+            self.record_phase('parse', started)
+            self.trigger_event('request_received')
 
+            started = perf_counter()
             self.determine_endpoint()
-            self.trigger_event('endpoint_determined', self)
+            self.record_phase('routing', started)
+            self.trigger_event('endpoint_determined')
 
+            started = perf_counter()
             self.dispatch_request()
-            self.trigger_event('response_created', self)
+            self.record_phase('dispatch', started)
+            self.trigger_event('response_created')
+
+            started = perf_counter()
+            self.compress_response()
+            self.record_phase('compression', started)
 
             self.status = Context.FINISHED
         except Exception as e:
             if self.config.get('DEBUG'):
                 self.logger.exception('Request processing ended with exception:')
             self.status = Context.ERROR
-            self.exception = HTTPBaseException(str(e), name=e.__class__.__name__).with_traceback(sys.exc_info()[2])
+            self.exception = e
+        finally:
+            return self.response, self.status, self.exception
+
+    async def execute_async(self):
+        """Asynchronous counterpart of `execute`, used when serving over ASGI"""
+        try:
+            await self.trigger_event_async('context_created')
+
+            started = perf_counter()
+            self.request = self.make_request()
+            self.record_phase('parse', started)
+            await self.trigger_event_async('request_received')
+
+            started = perf_counter()
+            self.determine_endpoint()
+            self.record_phase('routing', started)
+            await self.trigger_event_async('endpoint_determined')
+
+            started = perf_counter()
+            await self.receive_body()
+            self.record_phase('parse', started)
+
+            started = perf_counter()
+            await self.dispatch_request_async()
+            self.record_phase('dispatch', started)
+            await self.trigger_event_async('response_created')
+
+            started = perf_counter()
+            self.compress_response()
+            self.record_phase('compression', started)
+
+            self.status = Context.FINISHED
+        except Exception as e:
+            if self.config.get('DEBUG'):
+                self.logger.exception('Request processing ended with exception:')
+            self.status = Context.ERROR
+            self.exception = e
         finally:
             return self.response, self.status, self.exception
 
     def determine_endpoint(self):
         """Determine which resource/view is located at the given URL, and extract URL parameters"""
-        self.endpoint, self.request.url_parameters = self.match_route(self.request.url, self.request.method)
+        self.route, self.request.url_parameters = self.resolve_route(self.request.url, self.request.method)
+        self.endpoint = self.route.endpoint
+        self.hooks = self.hooks_for(self.endpoint)
+        if self.route.max_body_size is not None:
+            self.request.max_body_size = self.route.max_body_size
+
+    async def receive_body(self):
+        """Receive the body of a request served over ASGI, once its route and
+        body size limit are known, parsing large bodies in the executor
+
+        Bodies without a Content-Length (chunked HTTP/1.1 or HTTP/2 ones) are
+        received for the methods which carry a body.
+        """
+        pending = self.environ['wsgi.input']
+        if not isinstance(pending, PendingASGIBody) or self.response is not None:
+            return
+
+        content_length = self.request.headers.content_length if self.environ.get('CONTENT_LENGTH') else None
+        if content_length == 0 or (content_length is None and self.request.method not in BODY_METHODS):
+            return
+        max_body_size = self.request.max_body_size
+        max_body_size = max_body_size if max_body_size is not None else MAX_REQUEST_BODY_SIZE
+        if content_length is not None and content_length > max_body_size:
+            raise RequestBodyTooLarge('Request body exceeds the limit of %d bytes' % max_body_size)
+
+        body_stream = self.environ['wsgi.input'] = await read_asgi_body(pending.receive, max_body_size)
+        size = body_stream.seek(0, 2)
+        body_stream.seek(0)
+        if content_length is None and size:
+            # The body ends with the stream, as with WSGI servers which dechunk request bodies
+            self.environ['wsgi.input_terminated'] = True
+        if size > ASYNC_PARSE_SIZE:
+            self.request.body = await run_in_executor(self.executor, self.request.load_body)
 
     def dispatch_request(self):
-        """Dispatch request to the endpoint resource and obtain the response"""
-        self.response = (self.endpoint()(self) if issubclass(self.endpoint, Resource)
-                         else dispatch_to_endpoint(self.endpoint, self))
+        """Dispatch request to the endpoint resource and obtain the response,
+        unless a hook has already provided one"""
+        if self.response is None:
+            self.response = self.route.dispatch(self).conditional(self.request)
+
+    async def dispatch_request_async(self):
+        """Asynchronous counterpart of `dispatch_request`"""
+        if self.response is None:
+            self.response = (await self.route.dispatch_async(self)).conditional(self.request)
+
+    def trigger_event(self, event):
+        """Activate the hooks listening to the event, global and endpoint ones"""
+        hooks = self.hooks.get(event)
+        if hooks is not None:
+            started = perf_counter()
+            for hook in hooks:
+                run_sync(hook(self))
+            self.record_phase('hooks', started)
+
+    async def trigger_event_async(self, event):
+        """Asynchronous counterpart of `trigger_event`, awaiting coroutine hooks"""
+        hooks = self.hooks.get(event)
+        if hooks is not None:
+            started = perf_counter()
+            for hook in hooks:
+                await resolve(hook(self))
+            self.record_phase('hooks', started)
+
+    def record_phase(self, phase, started):
+        """Add the time elapsed since `started` to the phase timing, if timings are collected"""
+        if self.timings is not None:
+            self.timings[phase] += perf_counter() - started
+
+    def record_nested_phase(self, phase, parent, started):
+        """Move the time elapsed since `started` out of the `parent` phase, which
+        is still being timed, into `phase`"""
+        if self.timings is not None:
+            elapsed = perf_counter() - started
+            self.timings[phase] += elapsed
+            self.timings[parent] -= elapsed
+
+    def compress_response(self):
+        """Compress the response body if compression is enabled and accepted by the client"""
+        if self.compressor is not None:
+            self.response = self.compressor.compress(self.response, self.request.headers.raw('Accept-Encoding'))
 
     def retrieve_param(self, param_name):
         """Return parameter value from the request context, or None if it's not there"""
-        locations = [self.request.url_parameters, self.request.args]
-
-        if self.request.method in ('POST', 'PUT', 'PATCH'):
-            locations.append(self.request.body)
-
-        for location in locations:
-            if param_name in location:
-                return location[param_name]
+        if param_name in self.request.url_parameters:
+            return self.request.url_parameters[param_name]
+        if param_name in self.request.args:
+            return self.request.args[param_name]
+        if self.request.method in BODY_METHODS and isinstance(self.request.body, dict):
+            return self.request.body.get(param_name)
 
 
 class Extension:
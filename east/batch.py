@@ -0,0 +1,114 @@
+"""
+    east.batch
+    ==========
+    Batch requests: a JSON array of sub-requests served through the regular
+    request pipeline, concurrently, in a single HTTP round trip
+
+    :copyright: (c) 2016 by Zvonimir Jurelinac
+    :license: MIT
+"""
+
+import asyncio
+import io
+import urllib.parse
+
+from east.codecs import decode_json, encode_json_compact
+from east.exceptions import *
+from east.http import Response
+from east.routing import HTTP_METHODS
+
+
+BATCH_ENVIRON_KEY = 'east.batch'
+MAX_BATCH_REQUESTS = 20
+
+
+class BatchHandler:
+    """Serves batch requests for the app
+
+    The request body is a JSON array of `{method, path, args, body}` objects.
+    Each sub-request gets a copy of the batch request environ (so it carries
+    the same authorization and client address) and is served by the app like
+    any other request, on the app thread pool, or concurrently on the event
+    loop under ASGI. The response is a JSON array of `{status, body}` objects,
+    in the order of the sub-requests.
+    """
+
+    def __init__(self, app, max_requests=MAX_BATCH_REQUESTS):
+        self.app = app
+        self.max_requests = max_requests
+
+    def __call__(self, context):
+        """`endpoint_determined` hook of the batch route, providing its response"""
+        if context.response is not None:
+            return
+        if context.environ.get(BATCH_ENVIRON_KEY):
+            raise HTTPBadRequest('Batch requests cannot be nested')
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            environs = self.make_environs(context)
+            context.response = self.make_response(list(self.app.executor.map(self.app.handle_request, environs)))
+            return
+        # Served over ASGI, return a coroutine for the hook runner to await
+        return self.serve_async(context)
+
+    async def serve_async(self, context):
+        # The hook runs before the ASGI request body is otherwise received
+        await context.receive_body()
+        environs = self.make_environs(context)
+        responses = await asyncio.gather(*[self.app.handle_request_async(environ) for environ in environs])
+        context.response = self.make_response(responses)
+
+    def make_environs(self, context):
+        return [make_sub_environ(context.environ, item) for item in self.parse(context.request.body)]
+
+    def parse(self, body):
+        if not isinstance(body, list):
+            raise HTTPBadRequest('Batch request body must be a JSON array of requests')
+        if len(body) > self.max_requests:
+            raise HTTPBadRequest('Batch request exceeds the limit of %d requests' % self.max_requests)
+        for item in body:
+            if not isinstance(item, dict) or not isinstance(item.get('path'), str) \
+                    or not item['path'].startswith('/'):
+                raise HTTPBadRequest('Each batch request must be an object with an absolute `path`')
+            if str(item.get('method', 'GET')).upper() not in HTTP_METHODS:
+                raise HTTPBadRequest('Unsupported batch request method `%s`' % item.get('method'))
+            if not isinstance(item.get('args', {}), dict):
+                raise HTTPBadRequest('Batch request `args` must be an object')
+        return body
+
+    def make_response(self, responses):
+        results = [{'status': response.status, 'body': response_body(response)} for response in responses]
+        return Response(self.app.codecs.encode('application/json', results), 200, content_type='application/json')
+
+
+def make_sub_environ(environ, item):
+    """Build the environ of a sub-request from the batch request environ"""
+    sub_environ = {k: v for k, v in environ.items() if k not in ('CONTENT_TYPE', 'CONTENT_LENGTH',
+                                                                 'HTTP_ACCEPT_ENCODING', 'HTTP_IF_NONE_MATCH')}
+    path, _, query_string = item['path'].partition('?')
+    args = item.get('args')
+    if args:
+        query_string = '&'.join(filter(None, (query_string, urllib.parse.urlencode(args, doseq=True))))
+
+    body = encode_json_compact(item['body']) if item.get('body') is not None else b''
+    sub_environ.update({
+        'REQUEST_METHOD': str(item.get('method', 'GET')).upper(),
+        'PATH_INFO': path,
+        'QUERY_STRING': query_string,
+        'CONTENT_TYPE': 'application/json' if body else '',
+        'CONTENT_LENGTH': str(len(body)) if body else '',
+        'wsgi.input': io.BytesIO(body),
+        BATCH_ENVIRON_KEY: True,
+    })
+    sub_environ.pop('wsgi.input_terminated', None)
+    return sub_environ
+
+
+def response_body(response):
+    """Return the response body as a JSON value: decoded if it is JSON, text otherwise"""
+    body = b''.join(response.iter_body())
+    response.close()
+    if response.content_type == 'application/json' and body:
+        return decode_json(body)
+    return body.decode('utf8', 'replace')
@@ -0,0 +1,94 @@
+"""
+    east.coalescing
+    ===============
+    Single-flight request coalescing: identical concurrent requests wait for
+    one of them to be dispatched and share its response
+
+    :copyright: (c) 2016 by Zvonimir Jurelinac
+    :license: MIT
+"""
+
+import asyncio
+import threading
+
+from east.concurrency import make_event
+
+
+class Flight:
+    """Single in-flight dispatch, shared by identical requests"""
+    __slots__ = ('done', 'response', 'exception')
+
+    def __init__(self, done):
+        self.done = done
+        self.response = None
+        self.exception = None
+
+    def shared_response(self):
+        """Return a copy of the response, or None if it is streamed, as a
+        streamed body can only be consumed once"""
+        if self.exception is not None:
+            raise self.exception
+        return None if self.response.streamed else self.response.copy()
+
+
+class SingleFlight:
+    """Request coalescer of a single route
+
+    Requests are identical if they have the same method, URL, query string
+    and values of the `headers`. While one of them is being dispatched, the
+    others wait for it and get a copy of its response, or its exception.
+    Streamed responses are not shared, waiting requests dispatch on their own.
+    """
+
+    def __init__(self, headers=()):
+        self.headers = tuple(headers)
+        self._flights = {}
+        self._async_flights = {}
+        self._lock = threading.Lock()
+
+    def make_key(self, request):
+        return (request.method, request.url, request.environ.get('QUERY_STRING', ''),
+                tuple(request.headers.raw(name) for name in self.headers))
+
+    def call(self, context, dispatch):
+        """Dispatch the request with `dispatch(context)`, unless an identical one is in flight"""
+        key = self.make_key(context.request)
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight(make_event())
+
+        if not leader:
+            flight.done.wait()
+            return flight.shared_response() or dispatch(context)
+
+        try:
+            flight.response = dispatch(context)
+        except Exception as e:
+            flight.exception = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.shared_response() or flight.response
+
+    async def call_async(self, context, dispatch):
+        """Asynchronous counterpart of `call`, for requests served on the event loop"""
+        key = self.make_key(context.request)
+        flight = self._async_flights.get(key)
+        if flight is not None:
+            await flight.done.wait()
+            return flight.shared_response() or await dispatch(context)
+
+        flight = self._async_flights[key] = Flight(asyncio.Event())
+        try:
+            flight.response = await dispatch(context)
+        except Exception as e:
+            flight.exception = e
+            raise
+        finally:
+            del self._async_flights[key]
+            flight.done.set()
+        return flight.shared_response() or flight.response
@@ -0,0 +1,122 @@
+"""
+    east.codecs
+    ===========
+    Registry of encoders and decoders for request and response bodies
+
+    :copyright: (c) 2016 by Zvonimir Jurelinac
+    :license: MIT
+"""
+
+import json
+import urllib.parse
+
+from collections import namedtuple
+
+from east.exceptions import *
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+Codec = namedtuple('Codec', 'encode decode')
+
+
+class CodecRegistry:
+    """Encoders and decoders, keyed by content type
+
+    An encoder takes an object and an optional `default` function (called for
+    objects which cannot be encoded natively) and returns bytes; a decoder
+    takes bytes or str and returns the decoded object. JSON uses `orjson`
+    when it is installed, and the standard library otherwise, as well as for
+    what `orjson` does not support: indents other than 2 spaces and integers
+    wider than 64 bits.
+    """
+
+    def __init__(self, indent=None):
+        self.indent = indent
+        self.codecs = {
+            'application/json': Codec(self.encode_json, decode_json),
+            'application/x-ndjson': Codec(encode_json_compact, decode_json),
+            'application/x-www-form-urlencoded': Codec(encode_urlencoded, decode_urlencoded),
+        }
+
+    def register(self, content_type, encode=None, decode=None):
+        """Register a codec for the content type, keeping the current encoder
+        or decoder for whichever of them is not given"""
+        current = self.codecs.get(content_type, Codec(None, None))
+        self.codecs[content_type] = Codec(encode or current.encode, decode or current.decode)
+
+    def encoder(self, content_type):
+        """Return the encoder for the content type, or None if there is none"""
+        codec = self.codecs.get(content_type)
+        return codec.encode if codec is not None else None
+
+    def decoder(self, content_type):
+        """Return the decoder for the content type, or None if there is none"""
+        codec = self.codecs.get(content_type)
+        return codec.decode if codec is not None else None
+
+    def encode(self, content_type, obj, default=None):
+        return self.codecs[content_type].encode(obj, default)
+
+    def decode(self, content_type, data):
+        return self.codecs[content_type].decode(data)
+
+    def encode_json(self, obj, default=None):
+        """Encode JSON, indented if the registry `indent` is set"""
+        if self.indent is None:
+            return encode_json_compact(obj, default)
+        if orjson is not None and self.indent == 2:
+            try:
+                return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2)
+            except TypeError:
+                pass
+        return json.dumps(obj, default=default, indent=self.indent, separators=(',', ': ')).encode('utf8')
+
+
+def encode_json_compact(obj, default=None):
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(obj, default=default, separators=(',', ':')).encode('utf8')
+
+
+def decode_json(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def encode_urlencoded(obj, default=None):
+    return urllib.parse.urlencode(obj, doseq=True).encode('utf8')
+
+
+def decode_urlencoded(data):
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode('utf8')
+    return {k: (v[0] if len(v) == 1 else v) for k, v in urllib.parse.parse_qs(data, keep_blank_values=True).items()}
+
+
+def jsondict_default(**kwargs):
+    """Make a `default` encoder function which converts objects implementing
+    `to_jsondict`, looking the method up only once per type"""
+    converters = {}
+
+    def default(obj):
+        obj_type = type(obj)
+        try:
+            converter = converters[obj_type]
+        except KeyError:
+            converter = converters[obj_type] = getattr(obj_type, 'to_jsondict', None)
+        if converter is None:
+            raise UnexpectedResponseType('%s cannot be converted to JSON format.' % obj)
+        return converter(obj, **kwargs)
+
+    return default
+
+
+default_codecs = CodecRegistry()
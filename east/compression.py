@@ -0,0 +1,102 @@
+"""
+    east.compression
+    ================
+    Response body compression, negotiated from the Accept-Encoding header
+
+    :copyright: (c) 2016 by Zvonimir Jurelinac
+    :license: MIT
+"""
+
+import zlib
+
+from east.multipart import parse_content_type
+
+
+WBITS = {'gzip': 31, 'deflate': 15}
+INCOMPRESSIBLE_TYPES = ('image/', 'video/', 'audio/', 'font/woff', 'application/zip', 'application/gzip',
+                        'application/x-gzip', 'application/x-bzip2', 'application/x-7z-compressed',
+                        'application/pdf')
+
+
+class Compressor:
+    """Compresses response bodies with gzip or deflate
+
+    Bodies smaller than `min_size` bytes, bodies of already compressed content
+    types, responses which already have a Content-Encoding and those
+    supporting byte ranges (which refer to the uncompressed body) are sent as
+    they are. Streamed bodies are compressed incrementally, chunk by chunk,
+    and strong ETags of compressed responses are made weak.
+    `levels` maps content types to compression levels, with `default_level`
+    used for the rest.
+    """
+
+    def __init__(self, min_size=1024, levels=None, default_level=6):
+        self.min_size = min_size
+        self.levels = levels or {}
+        self.default_level = default_level
+
+    def compress(self, response, accept_encoding):
+        """Return the response with its body compressed, if the client accepts it"""
+        if not self.should_compress(response):
+            return response
+
+        response.headers['Vary'] = response.headers.get('Vary', []) + ['Accept-Encoding']
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding is None:
+            return response
+
+        level = self.levels.get(parse_content_type(response.content_type)[0], self.default_level)
+        if response.streamed:
+            response.body = iter_compressed(response.body, encoding, level)
+        else:
+            body = response.body.encode('utf8') if isinstance(response.body, str) else response.body
+            compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS[encoding])
+            response.body = compressor.compress(body) + compressor.flush()
+            response.content_length = len(response.body)
+            response.headers['Content-Length'] = str(response.content_length)
+
+        response.headers['Content-Encoding'] = encoding
+        etag = response.headers.get('ETag')
+        if etag and not etag[0].startswith('W/'):
+            # A strong ETag identifies the exact bytes, which the encoded body no longer are
+            response.headers['ETag'] = 'W/' + etag[0]
+        return response
+
+    def should_compress(self, response):
+        if response.status < 200 or response.status in (204, 304) or 'Content-Encoding' in response.headers \
+                or 'Accept-Ranges' in response.headers:
+            return False
+        if response.content_type is None or response.content_type.startswith(INCOMPRESSIBLE_TYPES):
+            return False
+        return response.streamed or response.content_length >= self.min_size
+
+
+def iter_compressed(chunks, encoding, level):
+    """Compress a stream of chunks incrementally"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS[encoding])
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode('utf8') if isinstance(chunk, str) else chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def negotiate_encoding(accept_encoding):
+    """Pick the preferred supported encoding from the Accept-Encoding header"""
+    if not accept_encoding:
+        return None
+
+    best, best_quality = None, 0
+    for item in accept_encoding.split(','):
+        coding, params = parse_content_type(item)
+        try:
+            quality = float(params.get('q', 1))
+        except ValueError:
+            continue
+        if coding == '*':
+            coding = 'gzip'
+        if quality <= 0:
+            continue
+        if coding in WBITS and (quality > best_quality or quality == best_quality and coding == 'gzip'):
+            best, best_quality = coding, quality
+    return best
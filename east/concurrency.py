@@ -0,0 +1,57 @@
+"""
+    east.concurrency
+    ================
+    Helpers shared by the synchronous (WSGI) and asynchronous (ASGI) request
+    serving paths, for calling code which may or may not be a coroutine
+
+    :copyright: (c) 2016 by Zvonimir Jurelinac
+    :license: MIT
+"""
+
+import asyncio
+import functools
+import inspect
+import sys
+import threading
+
+
+def is_async_callable(f):
+    """Check whether calling `f` produces an awaitable"""
+    while isinstance(f, functools.partial):
+        f = f.func
+    return inspect.iscoroutinefunction(f) or inspect.iscoroutinefunction(getattr(f, '__call__', None))
+
+
+def run_sync(value):
+    """Resolve a possibly awaitable value from synchronous code, running it
+    in a fresh event loop if needed"""
+    if inspect.isawaitable(value):
+        return asyncio.run(resolve(value))
+    return value
+
+
+async def resolve(value):
+    """Await the value if it is awaitable, otherwise return it unchanged"""
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+async def run_in_executor(executor, f, *args, **kwargs):
+    """Run a blocking callable in the executor, without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(f, *args, **kwargs))
+
+
+def make_event():
+    """Create an event for waiting on other requests being served: a gevent
+    event inside greenlets of a process where threading is not monkey-patched,
+    a threading event otherwise"""
+    if 'gevent' in sys.modules:
+        import gevent.monkey
+        if not gevent.monkey.is_module_patched('threading'):
+            import gevent.event
+            import greenlet
+            if greenlet.getcurrent().parent is not None:
+                return gevent.event.Event()
+    return threading.Event()
@@ -14,9 +14,10 @@ class HTTPBaseException(Exception):
     status_code = 500
     name = 'HTTP Base Exception'
 
-    def __init__(self, description='', name=None, data={}):
+    def __init__(self, description='', name=None, data={}, headers=None):
         self.description = description
         self.data = data
+        self.headers = headers
 
         if name is not None:
             self.name = name
@@ -24,11 +25,13 @@ class HTTPBaseException(Exception):
     def __str__(self):
         return '%s' % self.description
 
-    def as_response(self):
+    def as_response(self, codecs=None):
         from east.http import Response
-        from east.functions import make_json
-        return Response(make_json({'code': self.status_code, 'name': self.name,
-                                   'description': self.description}), self.status_code)
+        from east.codecs import default_codecs
+        codecs = codecs if codecs is not None else default_codecs
+        return Response(codecs.encode('application/json', {'code': self.status_code, 'name': self.name,
+                                                           'description': self.description}),
+                        self.status_code, self.headers, content_type='application/json')
 
 
 class HTTPBadRequest(HTTPBaseException):
@@ -159,7 +162,7 @@ class UnknownRequestBodyType(HTTPBadRequest, TypeError):
     name = 'Unknown Request Body Type'
 
 
-class RequestBodyTooLarge(HTTPBadRequest, ValueError):
+class RequestBodyTooLarge(HTTPPayloadTooLarge, ValueError):
     name = 'Request Body Too Large'
 
 
@@ -0,0 +1,155 @@
+"""
+    east.ext.cache
+    ==============
+    In-memory HTTP response cache, with ETag generation and conditional GET
+    (304 Not Modified) support
+"""
+
+import hashlib
+import threading
+import time
+
+from collections import OrderedDict, namedtuple
+
+from east.app import Extension
+from east.http import Response
+
+
+CachePolicy = namedtuple('CachePolicy', 'ttl args vary')
+CacheEntry = namedtuple('CacheEntry', 'body status content_type headers etag expires size')
+
+
+class ResponseCache(Extension):
+    """Response cache extension
+
+    Endpoints opt in with the `cached` decorator. Responses of successful GET
+    requests are kept in a LRU cache bounded by `max_bytes`, keyed by the URL,
+    the selected query arguments and the values of the `vary` headers. Hits
+    are answered in the `endpoint_determined` hook of the endpoint, so it is
+    not called at all, and `If-None-Match` requests matching the ETag get 304.
+    """
+
+    ENTRY_OVERHEAD = 256
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entry_bytes=None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else max_bytes // 8
+        self.storage = None
+        self.app = None
+
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def install(self, app, ext_storage):
+        self.app = app
+        self.storage = ext_storage
+        self.storage.cached_endpoints = {}
+
+    def cached(self, ttl, args=None, vary=()):
+        """Decorator for caching endpoint responses for `ttl` seconds
+
+        `args` lists the query arguments which are a part of the cache key (by
+        default, the whole query string is), and `vary` the request headers.
+        """
+        def decorator(f):
+            self.storage.cached_endpoints[f] = CachePolicy(ttl, tuple(args) if args is not None else None,
+                                                           tuple(vary))
+            self.app.register_hook('endpoint_determined', self.serve_cached, endpoint=f)
+            self.app.register_hook('response_created', self.store_response, endpoint=f)
+            return f
+        return decorator
+
+    def serve_cached(self, context):
+        policy = self.storage.cached_endpoints[context.endpoint]
+        if context.response is not None or context.request.method != 'GET':
+            return
+
+        key = self.make_key(context, policy)
+        context.data.response_cache = (key, policy)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                else:
+                    self._remove(key)
+                    entry = None
+            if entry is None:
+                self.misses += 1
+
+        if entry is not None:
+            context.data.response_cache = None
+            context.response = self.make_response(context, entry, policy)
+
+    def store_response(self, context):
+        cache_info = getattr(context.data, 'response_cache', None)
+        response = context.response
+        if cache_info is None or response.status != 200 or response.streamed:
+            return
+
+        key, policy = cache_info
+        body = response.body if isinstance(response.body, bytes) else str(response.body).encode('utf8')
+        etag = '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+        extra_headers = {k: v for k, v in response.headers.items() if k not in ('Content-Type', 'Content-Length')}
+        entry = CacheEntry(body, response.status, response.content_type, extra_headers, etag,
+                           time.monotonic() + policy.ttl, len(body) + len(key[1]) + self.ENTRY_OVERHEAD)
+
+        if entry.size <= self.max_entry_bytes:
+            with self._lock:
+                if key in self._entries:
+                    self._remove(key)
+                self._entries[key] = entry
+                self._size += entry.size
+                while self._size > self.max_bytes:
+                    self._remove(next(iter(self._entries)))
+
+        context.response = self.make_response(context, entry, policy)
+
+    def make_key(self, context, policy):
+        request = context.request
+        if policy.args is None:
+            args = request.environ.get('QUERY_STRING', '')
+        else:
+            args = tuple(str(request.args.get(name)) for name in policy.args)
+        headers = tuple(request.headers.raw(name) for name in policy.vary)
+        return request.method, request.url, args, headers
+
+    def make_response(self, context, entry, policy):
+        """Build the response for a cache entry, or 304 if the client has it already"""
+        headers = dict(entry.headers, ETag=entry.etag)
+        headers['Cache-Control'] = 'max-age=%d' % policy.ttl
+        if policy.vary:
+            headers['Vary'] = ', '.join(policy.vary)
+
+        if etag_matches(context.request.headers.raw('If-None-Match'), entry.etag):
+            return Response(b'', 304, headers=headers, content_type=None)
+        return Response(entry.body, entry.status, headers=headers, content_type=entry.content_type)
+
+    def invalidate(self):
+        """Remove all cached responses"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        """Return cache statistics"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries),
+                    'bytes': self._size, 'max_bytes': self.max_bytes}
+
+    def _remove(self, key):
+        self._size -= self._entries.pop(key).size
+
+
+def etag_matches(if_none_match, etag):
+    """Check whether the If-None-Match header value matches the ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return etag in (tag.strip().lstrip('W/') for tag in if_none_match.split(','))
@@ -1,34 +1,176 @@
 """
     east.ext.jwt
     ============
-    Mock JWT authentication module
+    JWT authentication: HS256/HS512 bearer token verification, with a cache
+    of verified tokens
 """
 
+import base64
+import binascii
+import hashlib
+import hmac
+import threading
+import time
+
+from collections import OrderedDict
+
 from east.app import Extension
+from east.codecs import decode_json, encode_json_compact
 from east.exceptions import HTTPUnauthorized
 
 
+ALGORITHMS = {'HS256': hashlib.sha256, 'HS512': hashlib.sha512}
+CACHE_SIZE = 4096
+
+
 class JWT(Extension):
+    """JWT authentication extension
+
+    Endpoints decorated with `required` accept only requests carrying a valid
+    token signed with `secret` in the `Authorization: Bearer` header; its
+    claims are available as `context.claims`. Expiration (`exp`) and
+    not-before (`nbf`) claims are checked with `leeway` seconds of tolerance,
+    as well as the `audience` and `issuer`, if given. An optional
+    `identity_verificator(context)` can reject the request by returning
+    a false value.
+
+    Verified tokens are kept in a LRU cache of `cache_size` entries, keyed by
+    the token digest, until they expire, so the signature of a token is
+    checked only on its first use.
+    """
+
+    def __init__(self, secret, algorithms=('HS256', 'HS512'), identity_verificator=None, leeway=0,
+                 audience=None, issuer=None, cache_size=CACHE_SIZE):
+        unknown = set(algorithms) - set(ALGORITHMS)
+        if unknown:
+            raise ValueError('Unsupported JWT algorithms: %s' % ', '.join(sorted(unknown)))
 
-    def __init__(self, identity_verificator):
+        self.secret = secret.encode('utf8') if isinstance(secret, str) else secret
+        self.algorithms = frozenset(algorithms)
         self.identity_verificator = identity_verificator
+        self.leeway = leeway
+        self.audience = audience
+        self.issuer = issuer
+        self.cache_size = cache_size
         self.storage = None
+        self.app = None
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
 
     def install(self, app, ext_storage):
+        self.app = app
         self.storage = ext_storage
         self.storage.protected_routes = set()
-        app.register_hook('endpoint_determined', self.endpoint_protection)
-
-    def endpoint_protection(self, context):
-        if context.endpoint in self.storage.protected_routes:
-            if not self.identity_verificator(context):
-                raise JWTAuthorizationError('Authorization failed')
 
     def required(self, f):
         """Decorator for protecting routes"""
         self.storage.protected_routes.add(f)
+        self.app.register_hook('endpoint_determined', self.endpoint_protection, endpoint=f)
         return f
 
+    def endpoint_protection(self, context):
+        authorization = context.request.headers.raw('Authorization')
+        if authorization is None:
+            raise JWTAuthorizationError('Missing authorization token')
+        scheme, _, token = authorization.partition(' ')
+        if scheme.lower() != 'bearer' or not token:
+            raise JWTAuthorizationError('Expected a Bearer authorization token')
+
+        # A copy, so the cached claims are not changed by the request handling
+        context.claims = dict(self.verify(token.strip()))
+        if self.identity_verificator is not None and not self.identity_verificator(context):
+            raise JWTAuthorizationError('Authorization failed')
+
+    def verify(self, token):
+        """Verify the token and return its claims, raising `JWTAuthorizationError` if it is invalid"""
+        digest = hashlib.blake2b(token.encode('latin-1', 'replace'), digest_size=16).digest()
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(digest)
+            if cached is not None:
+                claims, expires = cached
+                if expires > now:
+                    self._cache.move_to_end(digest)
+                    return claims
+                del self._cache[digest]
+
+        claims, expires = self.check(token, now)
+        with self._lock:
+            self._cache[digest] = (claims, expires)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return claims
+
+    def decode(self, token, now=None):
+        """Check the token signature and claims, returning the claims"""
+        return self.check(token, now)[0]
+
+    def check(self, token, now=None):
+        """Check the token signature and claims, returning the claims and the
+        time until which the token is valid"""
+        try:
+            header_segment, payload_segment, signature_segment = token.encode('ascii').split(b'.')
+            header = decode_json(b64decode(header_segment))
+            signature = b64decode(signature_segment)
+        except (ValueError, UnicodeError, binascii.Error):
+            raise JWTAuthorizationError('Malformed token')
+
+        algorithm = header.get('alg') if isinstance(header, dict) else None
+        if algorithm not in self.algorithms:
+            raise JWTAuthorizationError('Unsupported token algorithm')
+        expected = hmac.new(self.secret, header_segment + b'.' + payload_segment, ALGORITHMS[algorithm]).digest()
+        if not hmac.compare_digest(expected, signature):
+            raise JWTAuthorizationError('Invalid token signature')
+
+        try:
+            claims = decode_json(b64decode(payload_segment))
+        except (ValueError, binascii.Error):
+            raise JWTAuthorizationError('Malformed token')
+        if not isinstance(claims, dict):
+            raise JWTAuthorizationError('Malformed token')
+
+        now = now if now is not None else time.time()
+        try:
+            expires = float(claims['exp']) + self.leeway if 'exp' in claims else float('inf')
+            not_before = float(claims['nbf']) - self.leeway if 'nbf' in claims else float('-inf')
+        except (TypeError, ValueError):
+            raise JWTAuthorizationError('Malformed token time claims')
+        if expires <= now:
+            raise JWTAuthorizationError('Token has expired')
+        if not_before > now:
+            raise JWTAuthorizationError('Token is not valid yet')
+        if self.issuer is not None and claims.get('iss') != self.issuer:
+            raise JWTAuthorizationError('Invalid token issuer')
+        if self.audience is not None:
+            audience = claims.get('aud')
+            if self.audience != audience and not (isinstance(audience, list) and self.audience in audience):
+                raise JWTAuthorizationError('Invalid token audience')
+        return claims, expires
+
+    def encode(self, claims, algorithm='HS256'):
+        """Create a token with the given claims, signed with the extension secret"""
+        header_segment = b64encode(encode_json_compact({'alg': algorithm, 'typ': 'JWT'}))
+        payload_segment = b64encode(encode_json_compact(claims))
+        signature = hmac.new(self.secret, header_segment + b'.' + payload_segment, ALGORITHMS[algorithm]).digest()
+        return b'.'.join((header_segment, payload_segment, b64encode(signature))).decode('ascii')
+
+    def clear_cache(self):
+        """Forget all verified tokens"""
+        with self._lock:
+            self._cache.clear()
+
 
 class JWTAuthorizationError(HTTPUnauthorized):
     name = 'JWT Authorization Error'
+
+    def __init__(self, description='', name=None, data={}, headers=None):
+        super().__init__(description, name, data, headers or {'WWW-Authenticate': 'Bearer'})
+
+
+def b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+
+def b64decode(segment):
+    return base64.urlsafe_b64decode(segment + b'=' * (-len(segment) % 4))
@@ -0,0 +1,130 @@
+"""
+    east.ext.ratelimit
+    ==================
+    In-process rate limiting with per-route, per-client token buckets
+"""
+
+import math
+import threading
+import time
+
+from collections import namedtuple
+
+from east.app import Extension
+from east.exceptions import HTTPTooManyRequests
+
+
+RateLimit = namedtuple('RateLimit', 'rate burst key')
+
+SHARDS = 16
+SWEEP_INTERVAL = 60.0
+
+
+def remote_addr(context):
+    """Default client key function, the client IP address"""
+    return context.environ.get('REMOTE_ADDR')
+
+
+class RateLimiter(Extension):
+    """Rate limiting extension
+
+    Each client, identified by the `key` function of the context (its IP
+    address by default), gets a token bucket per route, holding up to `burst`
+    requests and refilled at `rate` requests per second. Requests finding the
+    bucket empty are rejected in the `endpoint_determined` hook, before the
+    request body is parsed or the endpoint called, by raising
+    `HTTPTooManyRequests` with a `Retry-After` header. A key function
+    returning None exempts the request.
+
+    If `rate` is given, all routes are limited; otherwise only endpoints
+    decorated with `limit`, which also overrides the default limit.
+    """
+
+    def __init__(self, rate=None, burst=None, key=remote_addr, shards=SHARDS):
+        self.default = RateLimit(rate, burst or max(1, math.ceil(rate)), key) if rate is not None else None
+        self.buckets = BucketStore(shards)
+        self.storage = None
+        self.app = None
+        self.rejected = 0
+
+    def install(self, app, ext_storage):
+        self.app = app
+        self.storage = ext_storage
+        self.storage.limits = {}
+        if self.default is not None:
+            app.register_hook('endpoint_determined', self.check)
+
+    def limit(self, rate, burst=None, key=None):
+        """Decorator limiting the endpoint to `rate` requests per second per
+        client, with bursts of up to `burst` requests"""
+        def decorator(f):
+            default_key = self.default.key if self.default is not None else remote_addr
+            self.storage.limits[f] = RateLimit(rate, burst or max(1, math.ceil(rate)), key or default_key)
+            if self.default is None:
+                self.app.register_hook('endpoint_determined', self.check, endpoint=f)
+            return f
+        return decorator
+
+    def check(self, context):
+        policy = self.storage.limits.get(context.endpoint, self.default)
+        client = policy.key(context)
+        if client is None:
+            return
+
+        retry_after = self.buckets.take((context.route.url_rule, client), policy.rate, policy.burst)
+        if retry_after:
+            self.rejected += 1
+            retry_after = math.ceil(retry_after)
+            raise HTTPTooManyRequests('Rate limit exceeded, retry in %d seconds' % retry_after,
+                                      headers={'Retry-After': str(retry_after)})
+
+    def reset(self):
+        """Refill all buckets"""
+        self.buckets.clear()
+
+
+class BucketStore:
+    """Token buckets, sharded by key with a lock per shard
+
+    Buckets are refilled lazily, when a token is taken. A bucket which has
+    refilled completely is equivalent to a missing one, so each shard
+    periodically evicts those, keeping only recently active keys.
+    """
+
+    def __init__(self, shards=SHARDS, sweep_interval=SWEEP_INTERVAL):
+        self.shards = [(threading.Lock(), {}) for _ in range(shards)]
+        self.sweep_interval = sweep_interval
+        self._next_sweeps = [0.0] * shards
+
+    def take(self, key, rate, burst):
+        """Take a token from the bucket of the key, returning 0 on success, or
+        the number of seconds until a token is available"""
+        index = hash(key) % len(self.shards)
+        lock, buckets = self.shards[index]
+        now = time.monotonic()
+        with lock:
+            if now >= self._next_sweeps[index]:
+                self._next_sweeps[index] = now + self.sweep_interval
+                for stale in [k for k, bucket in buckets.items() if bucket[2] <= now]:
+                    del buckets[stale]
+
+            bucket = buckets.get(key)
+            if bucket is None:
+                tokens = burst
+            else:
+                tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            if tokens < 1:
+                return (1 - tokens) / rate
+
+            tokens -= 1
+            # [tokens, last refill, time at which the bucket is full again]
+            buckets[key] = [tokens, now, now + (burst - tokens) / rate]
+            return 0
+
+    def clear(self):
+        for lock, buckets in self.shards:
+            with lock:
+                buckets.clear()
+
+    def __len__(self):
+        return sum(len(buckets) for _, buckets in self.shards)
@@ -7,8 +7,6 @@
     :license: MIT
 """
 
-import json
-
 from collections.abc import Sequence
 
 
@@ -18,9 +16,5 @@ def identity(x):
 
 # Data conversion
 
-def make_json(obj):
-    return json.dumps(obj, indent=4, separators=(', ', ': ')).encode('utf8')
-
-
 def make_list(obj):
     return list(obj) if isinstance(obj, Sequence) and not isinstance(obj, str) else [obj]
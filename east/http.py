@@ -7,79 +7,487 @@
     :license: MIT
 """
 
-import json
+import email.utils
+import mmap
+import os
+import sys
+import tempfile
 import urllib.parse
 
+from east.codecs import default_codecs
 from east.structures import Headers, WSGIHeaders
 from east.exceptions import *
-from east.functions import identity
+from east.multipart import MultipartParser, parse_content_type, SPOOL_SIZE
 
 
 class Request:
-    """HTTP request representation"""
+    """HTTP request representation
 
-    def __init__(self, url, method, environ, body=None, headers=None, args={}):
+    Headers, query arguments and the body are parsed lazily, on first access,
+    so requests which are rejected early cost next to nothing.
+    """
+    __slots__ = ('url', 'method', 'environ', 'url_parameters', 'max_body_size', 'codecs',
+                 '_headers', '_args', '_body')
+
+    def __init__(self, url, method, environ, body=None, headers=None, args=None,
+                 max_body_size=None, codecs=None):
         self.url = url
         self.method = method
         self.environ = environ
-        self.headers = headers
-        self.args = args
-        self.body = {}
+        self.url_parameters = {}
+        self.max_body_size = max_body_size
+        self.codecs = codecs
+        self._headers = headers
+        self._args = args
+        self._body = body
 
     @classmethod
-    def parse_request(cls, environ):
-        """"""
+    def parse_request(cls, environ, max_body_size=None, codecs=None):
+        """Create the request from the WSGI environ, deferring any parsing"""
         request_url = '/' + environ['PATH_INFO'].lstrip('/')
         request_method = environ['REQUEST_METHOD']
-        http_headers = WSGIHeaders(environ)
-        request_args = parse_urlencoded_args(environ['QUERY_STRING'])
-        body = parse_request_body(environ['wsgi.input'], http_headers) if http_headers.get('Content-Length', "0") != "0" else {}
-        return cls(request_url, request_method, environ, body=body, headers=http_headers, args=request_args)
+        return cls(request_url, request_method, environ, max_body_size=max_body_size, codecs=codecs)
+
+    def reuse(self, environ, max_body_size=None, codecs=None):
+        """Reset the request to represent a new one, from the WSGI environ"""
+        self.__init__('/' + environ['PATH_INFO'].lstrip('/'), environ['REQUEST_METHOD'], environ,
+                      max_body_size=max_body_size, codecs=codecs)
+        return self
+
+    @property
+    def headers(self):
+        if self._headers is None:
+            self._headers = WSGIHeaders(self.environ)
+        return self._headers
+
+    @headers.setter
+    def headers(self, value):
+        self._headers = value
+
+    @property
+    def args(self):
+        if self._args is None:
+            self._args = parse_urlencoded_args(self.environ.get('QUERY_STRING', ''))
+        return self._args
+
+    @args.setter
+    def args(self, value):
+        self._args = value
+
+    @property
+    def body(self):
+        """Request body, read and parsed on first access within `max_body_size` bytes"""
+        if self._body is None:
+            self._body = self.load_body()
+        return self._body
+
+    @body.setter
+    def body(self, value):
+        self._body = value
+
+    def load_body(self):
+        """Read and parse the request body, rejecting bodies larger than `max_body_size` bytes"""
+        if self.headers.content_length or self.environ.get('wsgi.input_terminated'):
+            return parse_request_body(self.environ['wsgi.input'], self.headers, self.max_body_size, self.codecs)
+        return {}
 
 
 class Response:
-    """HTTP response representation"""
+    """HTTP response representation
+
+    The body is either a bytes/str object, or an iterable of bytes/str chunks
+    which is sent incrementally, without a Content-Length header.
+    """
+    __slots__ = ('body', 'status', 'headers', 'content_type', 'streamed', 'content_length')
 
     def __init__(self, body, status=200, headers=None, content_type='text/plain', **kw_headers):
         self.body = body
         self.status = status
-        self.headers = Headers()
-        self.headers['Content-Type'] = self.content_type = content_type
-        self.content_length = len(body)
-        self.headers['Content-Length'] = str(self.content_length)
+        self.content_type = content_type
+        self.streamed = not isinstance(body, (bytes, bytearray, str))
+        self.content_length = None if self.streamed else len(body)
+
+        if headers:
+            self.headers = Headers(headers)
+            if content_type is not None:
+                self.headers['Content-Type'] = content_type
+            if not self.streamed:
+                self.headers['Content-Length'] = str(self.content_length)
+        else:
+            header_list = [('Content-Type', content_type)] if content_type is not None else []
+            if not self.streamed:
+                header_list.append(('Content-Length', str(self.content_length)))
+            self.headers = Headers.from_list(header_list)
+
+    def copy(self):
+        """Return a copy of the response sharing the (non-streamed) body"""
+        response = Response.__new__(Response)
+        response.body = self.body
+        response.status = self.status
+        response.headers = Headers.from_list(list(self.headers.as_list()))
+        response.content_type = self.content_type
+        response.streamed = self.streamed
+        response.content_length = self.content_length
+        return response
+
+    def iter_body(self):
+        """Return an iterator over the response body as bytes chunks"""
+        if not self.streamed:
+            return iter((self.body.encode('utf8') if isinstance(self.body, str) else bytes(self.body),))
+        return StreamedBody(self.body)
+
+    def close(self):
+        """Release resources held by a streamed body"""
+        if self.streamed and hasattr(self.body, 'close'):
+            self.body.close()
+
+    def wsgi_body(self, environ):
+        """Return the body iterable handed to the WSGI server"""
+        return self.iter_body()
+
+    def conditional(self, request):
+        """Return the response to send for the request, taking its conditional
+        and range headers into account"""
+        return self
 
     @property
     def status_message(self):
         return '%d %s' % (self.status, HTTP_MESSAGES[self.status])
 
 
+class FileResponse(Response):
+    """Response sending a file, or a byte range of it, without loading it
+    into memory
+
+    The file is sent with the server `wsgi.file_wrapper` if there is one,
+    otherwise it is memory-mapped and sent in chunks. Supports single byte
+    range (206), `If-Modified-Since` (304) and HEAD requests.
+
+    The file is opened when the response is prepared for the request, and
+    its size and modification time taken from the opened file, so the
+    headers match what is sent even if the file changed since it was stat'ed.
+    """
+    __slots__ = ('path', 'size', 'mtime', 'last_modified', 'offset', 'file')
+
+    def __init__(self, path, size, mtime, status=200, content_type='application/octet-stream', offset=0,
+                 length=None, last_modified=None, file=None):
+        super().__init__(None, status, content_type=content_type)
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.file = file
+        self.last_modified = last_modified or email.utils.formatdate(mtime, usegmt=True)
+        self.offset = offset
+        self.content_length = size - offset if length is None else length
+
+        self.headers.add('Content-Length', self.content_length)
+        self.headers.add('Last-Modified', self.last_modified)
+        self.headers.add('Accept-Ranges', 'bytes')
+        if status == 206:
+            self.headers.add('Content-Range', 'bytes %d-%d/%d' % (offset, offset + self.content_length - 1, size))
+
+    def iter_body(self):
+        f = self.file if self.file is not None else open(self.path, 'rb')
+        with f:
+            # Bounded by the size of the opened file, as an empty file cannot be mapped and
+            # reading a mapping past the end of the file raises SIGBUS
+            size = os.fstat(f.fileno()).st_size
+            end = min(self.offset + self.content_length, size)
+            if end <= self.offset:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                end = min(end, len(mapped))
+                for position in range(self.offset, end, FILE_CHUNK_SIZE):
+                    yield mapped[position:min(position + FILE_CHUNK_SIZE, end)]
+
+    def wsgi_body(self, environ):
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        # File wrappers send the file to its end, so they can't serve ranges ending before it
+        if file_wrapper is None or not self.content_length or self.offset + self.content_length != self.size:
+            return self.iter_body()
+        f = self.file if self.file is not None else open(self.path, 'rb')
+        f.seek(self.offset)
+        return file_wrapper(f, FILE_CHUNK_SIZE)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+    def open(self):
+        """Open the file, returning the response for the size and modification time of the opened file"""
+        try:
+            f = open(self.path, 'rb')
+        except (FileNotFoundError, NotADirectoryError):
+            raise HTTPNotFound('Requested file was not found')
+        result = os.fstat(f.fileno())
+        if result.st_size == self.size and result.st_mtime == self.mtime:
+            self.file = f
+            return self
+        return FileResponse(self.path, result.st_size, result.st_mtime, self.status, self.content_type, file=f)
+
+    def without_body(self):
+        """Return a response with the headers of this one and an empty body, answering a HEAD request"""
+        self.close()
+        response = Response(b'', self.status, content_type=None)
+        response.headers = Headers.from_list(list(self.headers.as_list()))
+        response.content_type = self.content_type
+        return response
+
+    def conditional(self, request):
+        if self.status != 200 or request.method not in ('GET', 'HEAD'):
+            return self
+        if self.file is None:
+            response = self.open()
+            if response is not self:
+                return response.conditional(request)
+
+        response = self.select(request)
+        if request.method == 'HEAD' and response.content_length:
+            return response.without_body()
+        return response
+
+    def select(self, request):
+        """Return the response for the conditional and range headers of the request"""
+        if_modified_since = request.headers.raw('If-Modified-Since')
+        if if_modified_since is not None and not_modified_since(self.last_modified, if_modified_since):
+            self.close()
+            return Response(b'', 304, headers={'Last-Modified': self.last_modified}, content_type=None)
+
+        range_header = request.headers.raw('Range')
+        if_range = request.headers.raw('If-Range')
+        if range_header is None or (if_range is not None and if_range != self.last_modified):
+            return self
+
+        byte_range = parse_range(range_header, self.size)
+        if byte_range is None:
+            return self
+        start, end = byte_range
+        if start >= self.size:
+            self.close()
+            raise HTTPRangeNotSatisfiable('Requested range is not satisfiable',
+                                          headers={'Content-Range': 'bytes */%d' % self.size})
+        return FileResponse(self.path, self.size, self.mtime, 206, self.content_type, start, end - start + 1,
+                            self.last_modified, self.file)
+
+
+class StreamedBody:
+    """Iterator over a streamed response body, skipping empty chunks and
+    encoding text ones, which closes the body once exhausted or closed"""
+    __slots__ = ('body', 'chunks')
+
+    def __init__(self, body):
+        self.body = body
+        self.chunks = iter(body)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        for chunk in self.chunks:
+            if chunk:
+                return chunk.encode('utf8') if isinstance(chunk, str) else chunk
+        self.close()
+        raise StopIteration
+
+    def close(self):
+        if hasattr(self.body, 'close'):
+            self.body.close()
+
+
+class SentBytesCounter:
+    """Streamed response body wrapper counting the bytes consumed from it,
+    and calling `on_close` with their number once it is closed"""
+    __slots__ = ('body', 'chunks', 'sent', 'on_close')
+
+    def __init__(self, body, on_close):
+        self.body = body
+        self.chunks = iter(body)
+        self.sent = 0
+        self.on_close = on_close
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        chunk = next(self.chunks)
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf8')
+        self.sent += len(chunk)
+        return chunk
+
+    def close(self):
+        if self.on_close is not None:
+            on_close, self.on_close = self.on_close, None
+            if hasattr(self.body, 'close'):
+                self.body.close()
+            on_close(self.sent)
+
+
+def parse_range(range_header, size):
+    """Parse a single range `Range` header into inclusive `(start, end)` offsets,
+    returning None for unsupported (such as multiple range) or invalid headers"""
+    unit, _, ranges = range_header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in ranges:
+        return None
+    first, _, last = ranges.strip().partition('-')
+    try:
+        if not first:
+            suffix = int(last)
+            return (max(size - suffix, 0), size - 1) if suffix > 0 else (size, size)
+        start, end = int(first), int(last) if last else None
+    except ValueError:
+        return None
+    if start < 0 or (end is not None and end < start):
+        return None
+    return start, size - 1 if end is None else min(end, size - 1)
+
+
+def not_modified_since(last_modified, if_modified_since):
+    """Check whether the resource was not modified after the `If-Modified-Since` date"""
+    try:
+        return email.utils.parsedate_to_datetime(last_modified) <= \
+            email.utils.parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
 def parse_urlencoded_args(query_string):
     """Generate a key-value dict representing parameters from urlencoded string"""
     return {k: (v[0] if len(v) == 1 else v) for k, v in urllib.parse.parse_qs(query_string, keep_blank_values=True).items()}
 
 
-def parse_request_body(input_stream, http_headers):
-    """"""
-    content_type = http_headers['Content-Type']
-    content_length = http_headers['Content-Length']
+def parse_request_body(input_stream, http_headers, max_size=None, codecs=None):
+    """Parse the request body, reading it from the input stream in chunks
+
+    Multipart bodies are parsed incrementally with uploaded files spooled to
+    temporary files, other bodies are buffered up to `max_size` bytes and
+    decoded with the codec registered for their content type.
+    """
+    max_size = max_size if max_size is not None else MAX_REQUEST_BODY_SIZE
+    codecs = codecs if codecs is not None else default_codecs
+    content_type, params = parse_content_type(http_headers.content_type or '')
+    content_length = http_headers.content_length or None
+    charset = params.get('charset', 'utf8')
+
+    if content_length is not None and content_length > max_size:
+        raise RequestBodyTooLarge('Request body exceeds the limit of %d bytes' % max_size)
+
+    if content_type == 'multipart/form-data':
+        parser = MultipartParser(params.get('boundary'), charset)
+        for chunk in read_body_chunks(input_stream, content_length, max_size):
+            parser.feed(chunk)
+        return parser.close()
+
+    decoder = codecs.decoder(content_type)
+    if decoder is None and content_type != 'text/plain':
+        raise UnknownRequestBodyType('Unsupported request body type `%s`' % content_type)
+
+    body = bytearray()
+    for chunk in read_body_chunks(input_stream, content_length, max_size):
+        body += chunk
+
+    try:
+        if decoder is None:
+            return body.decode(charset)
+        return decoder(bytes(body) if charset.lower().replace('-', '') == 'utf8' else body.decode(charset))
+    except ValueError as e:
+        raise RequestParseError('Cannot parse request body: %s' % e)
+
+
+def read_body_chunks(input_stream, content_length=None, max_size=None, chunk_size=None):
+    """Generate request body chunks, reading up to `content_length` bytes or
+    until the end of the stream, and failing once more than `max_size` is read"""
+    chunk_size = chunk_size or BODY_CHUNK_SIZE
+    remaining = content_length
+    total = 0
+    while remaining is None or remaining > 0:
+        chunk = input_stream.read(chunk_size if remaining is None else min(chunk_size, remaining))
+        if not chunk:
+            break
+        total += len(chunk)
+        if max_size is not None and total > max_size:
+            raise RequestBodyTooLarge('Request body exceeds the limit of %d bytes' % max_size)
+        if remaining is not None:
+            remaining -= len(chunk)
+        yield chunk
+
+
+def make_environ(scope, body_stream):
+    """Build a WSGI-style environ dictionary from an ASGI HTTP connection scope
+
+    The `body_stream` is usually a `PendingASGIBody`, replaced with the
+    received body once the request route is known.
+    """
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_PROTOCOL': 'HTTP/%s' % scope.get('http_version', '1.1'),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body_stream,
+        'wsgi.errors': sys.stderr,
+        'asgi.scope': scope,
+    }
+
+    if scope.get('server'):
+        environ['SERVER_NAME'], environ['SERVER_PORT'] = scope['server'][0], str(scope['server'][1])
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+
+    for name, value in scope.get('headers', ()):
+        name, value = name.decode('latin-1').upper().replace('-', '_'), value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        environ[name] = environ[name] + ',' + value if name in environ else value
+
+    return environ
+
+
+class PendingASGIBody:
+    """Input stream of an ASGI request whose body has not been received yet"""
+
+    def __init__(self, receive):
+        self.receive = receive
+
+    def read(self, size=-1):
+        raise RuntimeError('ASGI request body is received after the `endpoint_determined` hooks, '
+                           'hooks of that event need to await `context.receive_body()` first')
+
+    def close(self):
+        pass
 
-    if content_length > MAX_REQUEST_BODY_SIZE:
-        raise RequestBodyTooLarge
 
-    if content_type == 'application/json':
-        parser = json.loads
-    elif content_type == 'application/x-www-form-urlencoded':
-        parser = parse_urlencoded_args
-    elif content_type == 'multipart/form-data':
-        raise NotImplementedError('Parsing multipart/form-data is not (yet) supported')
-    elif content_type == 'text/plain':
-        parser = identity
-    else:
-        raise UnknownRequestBodyType
+async def read_asgi_body(receive, max_size=None, spool_size=SPOOL_SIZE):
+    """Read the request body from an ASGI receive channel into a spooled
+    temporary file, so large bodies do not stay in memory, failing as soon as
+    more than `max_size` bytes are received"""
+    body_stream = tempfile.SpooledTemporaryFile(max_size=spool_size)
+    total = 0
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunk = message.get('body', b'')
+            total += len(chunk)
+            if max_size is not None and total > max_size:
+                raise RequestBodyTooLarge('Request body exceeds the limit of %d bytes' % max_size)
+            body_stream.write(chunk)
+            if not message.get('more_body', False):
+                break
+    except BaseException:
+        body_stream.close()
+        raise
+    body_stream.seek(0)
+    return body_stream
 
-    return parser(input_stream.read(content_length).decode())
 
 MAX_REQUEST_BODY_SIZE = 100 * 1024
+# ASGI request bodies larger than this are parsed in the executor, off the event loop
+ASYNC_PARSE_SIZE = 64 * 1024
+BODY_CHUNK_SIZE = 64 * 1024
+FILE_CHUNK_SIZE = 256 * 1024
 
 HTTP_MESSAGES = {
     100: 'Continue',
@@ -0,0 +1,152 @@
+"""
+    east.metrics
+    ============
+    In-process request metrics: per-route latency histograms, request phase
+    timings, status counters, in-flight requests and transferred bytes
+
+    :copyright: (c) 2016 by Zvonimir Jurelinac
+    :license: MIT
+"""
+
+import bisect
+import threading
+
+from collections import defaultdict
+
+from east.http import Response
+from east.routing import HTTP_METHODS
+from east.types import ResponseType
+
+
+# Methods outside of these are recorded as `OTHER`, bounding the label values
+METHOD_LABELS = frozenset(HTTP_METHODS)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PHASES = ('parse', 'routing', 'hooks', 'dispatch', 'compression')
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+class RouteMetrics:
+    """Metrics collected for a single (route, method) pair"""
+
+    def __init__(self, buckets):
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.duration_sum = 0.0
+        self.phase_sums = dict.fromkeys(PHASES, 0.0)
+        self.statuses = defaultdict(int)
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+
+class Metrics:
+    """Request metrics registry
+
+    `record` is called once per served request with its duration and phase
+    timings; `snapshot` returns the collected data as a dictionary and
+    `render_prometheus` in the Prometheus text exposition format.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.routes = {}
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def record(self, route, method, status, duration, timings=None, request_bytes=0, response_bytes=None):
+        """Record a finished request"""
+        key = (route or UNMATCHED_ROUTE, method if method in METHOD_LABELS else 'OTHER')
+        with self._lock:
+            self.in_flight -= 1
+            metrics = self.routes.get(key)
+            if metrics is None:
+                metrics = self.routes[key] = RouteMetrics(self.buckets)
+
+            metrics.bucket_counts[bisect.bisect_left(self.buckets, duration)] += 1
+            metrics.count += 1
+            metrics.duration_sum += duration
+            metrics.statuses[status] += 1
+            metrics.request_bytes += request_bytes or 0
+            metrics.response_bytes += response_bytes or 0
+            if timings:
+                for phase, value in timings.items():
+                    metrics.phase_sums[phase] += value
+
+    def reset(self):
+        with self._lock:
+            self.routes.clear()
+
+    def snapshot(self):
+        """Return collected metrics as a dictionary"""
+        with self._lock:
+            return {
+                'in_flight': self.in_flight,
+                'routes': [{
+                    'route': route,
+                    'method': method,
+                    'count': metrics.count,
+                    'duration_sum': metrics.duration_sum,
+                    'buckets': dict(zip(self.buckets + (float('inf'),), metrics.bucket_counts)),
+                    'phases': dict(metrics.phase_sums),
+                    'statuses': dict(metrics.statuses),
+                    'request_bytes': metrics.request_bytes,
+                    'response_bytes': metrics.response_bytes,
+                } for (route, method), metrics in sorted(self.routes.items())]
+            }
+
+    def render_prometheus(self):
+        """Render collected metrics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = [
+            '# HELP east_requests_in_flight Requests currently being served.',
+            '# TYPE east_requests_in_flight gauge',
+            'east_requests_in_flight %d' % snapshot['in_flight'],
+            '# HELP east_request_duration_seconds Request latency.',
+            '# TYPE east_request_duration_seconds histogram',
+        ]
+        for item in snapshot['routes']:
+            labels = 'route="%s",method="%s"' % (escape_label(item['route']), escape_label(item['method']))
+            cumulative = 0
+            for bound, count in item['buckets'].items():
+                cumulative += count
+                lines.append('east_request_duration_seconds_bucket{%s,le="%s"} %d'
+                             % (labels, '+Inf' if bound == float('inf') else repr(bound), cumulative))
+            lines.append('east_request_duration_seconds_sum{%s} %r' % (labels, item['duration_sum']))
+            lines.append('east_request_duration_seconds_count{%s} %d' % (labels, item['count']))
+
+        lines += ['# HELP east_request_phase_seconds_total Time spent in each request processing phase.',
+                  '# TYPE east_request_phase_seconds_total counter']
+        for item in snapshot['routes']:
+            labels = 'route="%s",method="%s"' % (escape_label(item['route']), escape_label(item['method']))
+            for phase, value in item['phases'].items():
+                lines.append('east_request_phase_seconds_total{%s,phase="%s"} %r' % (labels, phase, value))
+
+        lines += ['# HELP east_responses_total Responses by status code.',
+                  '# TYPE east_responses_total counter']
+        for item in snapshot['routes']:
+            labels = 'route="%s",method="%s"' % (escape_label(item['route']), escape_label(item['method']))
+            for status, count in sorted(item['statuses'].items()):
+                lines.append('east_responses_total{%s,status="%d"} %d' % (labels, status, count))
+
+        for name, key, description in (('east_request_bytes_total', 'request_bytes', 'Received request body bytes.'),
+                                       ('east_response_bytes_total', 'response_bytes', 'Sent response body bytes.')):
+            lines += ['# HELP %s %s' % (name, description), '# TYPE %s counter' % name]
+            for item in snapshot['routes']:
+                lines.append('%s{route="%s",method="%s"} %d' % (name, escape_label(item['route']),
+                                                                escape_label(item['method']), item[key]))
+
+        return '\n'.join(lines) + '\n'
+
+
+class PrometheusText(ResponseType):
+    """Prometheus text exposition format response formatter"""
+
+    def format(self, obj, status=200):
+        return Response(obj.encode('utf8'), status, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
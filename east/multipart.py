@@ -0,0 +1,182 @@
+"""
+    east.multipart
+    ==============
+    Incremental `multipart/form-data` parser, keeping memory usage bounded
+    by spooling large parts to temporary files
+
+    :copyright: (c) 2016 by Zvonimir Jurelinac
+    :license: MIT
+"""
+
+import tempfile
+
+from east.exceptions import *
+
+
+MAX_PART_HEADERS_SIZE = 16 * 1024
+SPOOL_SIZE = 64 * 1024
+
+
+class UploadedFile:
+    """File uploaded as a part of a multipart request body"""
+
+    def __init__(self, name, filename, content_type, spool_size=SPOOL_SIZE):
+        self.name = name
+        self.filename = filename
+        self.content_type = content_type
+        self.size = 0
+        self.file = tempfile.SpooledTemporaryFile(max_size=spool_size)
+
+    def write(self, data):
+        self.size += len(data)
+        self.file.write(data)
+
+    def read(self, size=-1):
+        return self.file.read(size)
+
+    def seek(self, offset, whence=0):
+        return self.file.seek(offset, whence)
+
+    def close(self):
+        self.file.close()
+
+    def __repr__(self):
+        return '<UploadedFile %s (%s, %d bytes)>' % (self.filename, self.content_type, self.size)
+
+
+class MultipartParser:
+    """Push-style multipart parser
+
+    Chunks of the request body are passed to `feed` as they are read, and
+    finished form fields and files are collected in `fields`. Regular fields
+    become strings, while parts with a filename become `UploadedFile`s.
+    """
+
+    PREAMBLE, DELIMITER, HEADERS, BODY, FINISHED = range(5)
+
+    def __init__(self, boundary, charset='utf8', spool_size=SPOOL_SIZE):
+        if not boundary:
+            raise RequestParseError('Multipart request body is missing the boundary')
+
+        self.delimiter = b'--' + boundary.encode('latin-1')
+        self.part_delimiter = b'\r\n' + self.delimiter
+        self.charset = charset
+        self.spool_size = spool_size
+
+        self.fields = {}
+        self.state = MultipartParser.PREAMBLE
+        self.buffer = bytearray()
+        self.part = None
+
+    def feed(self, chunk):
+        """Consume the next chunk of the request body"""
+        self.buffer += chunk
+
+        while True:
+            if self.state == MultipartParser.PREAMBLE:
+                index = self.buffer.find(self.delimiter)
+                if index < 0:
+                    del self.buffer[:max(0, len(self.buffer) - len(self.delimiter))]
+                    return
+                del self.buffer[:index + len(self.delimiter)]
+                self.state = MultipartParser.DELIMITER
+
+            elif self.state == MultipartParser.DELIMITER:
+                if len(self.buffer) < 2:
+                    return
+                if self.buffer[:2] == b'--':
+                    self.state = MultipartParser.FINISHED
+                elif self.buffer[:2] == b'\r\n':
+                    self.state = MultipartParser.HEADERS
+                else:
+                    raise RequestParseError('Malformed multipart request body')
+                del self.buffer[:2]
+
+            elif self.state == MultipartParser.HEADERS:
+                index = self.buffer.find(b'\r\n\r\n')
+                if index < 0:
+                    if len(self.buffer) > MAX_PART_HEADERS_SIZE:
+                        raise RequestParseError('Multipart part headers are too large')
+                    return
+                self.start_part(bytes(self.buffer[:index]))
+                del self.buffer[:index + 4]
+                self.state = MultipartParser.BODY
+
+            elif self.state == MultipartParser.BODY:
+                index = self.buffer.find(self.part_delimiter)
+                if index < 0:
+                    safe_length = len(self.buffer) - len(self.part_delimiter) + 1
+                    if safe_length > 0:
+                        self.part.write(bytes(self.buffer[:safe_length]))
+                        del self.buffer[:safe_length]
+                    return
+                self.part.write(bytes(self.buffer[:index]))
+                del self.buffer[:index + len(self.part_delimiter)]
+                self.finish_part()
+                self.state = MultipartParser.DELIMITER
+
+            else:
+                self.buffer.clear()
+                return
+
+    def close(self):
+        """Finish parsing and return the parsed fields"""
+        if self.state != MultipartParser.FINISHED:
+            raise RequestParseError('Multipart request body ended unexpectedly')
+        return self.fields
+
+    def start_part(self, raw_headers):
+        headers = {}
+        for line in raw_headers.decode(self.charset, 'replace').split('\r\n'):
+            if ':' in line:
+                key, value = line.split(':', 1)
+                headers[key.strip().lower()] = value.strip()
+
+        disposition, params = parse_content_type(headers.get('content-disposition', ''))
+        if disposition != 'form-data' or 'name' not in params:
+            raise RequestParseError('Multipart part is missing a form-data content disposition')
+
+        if 'filename' in params:
+            self.part = UploadedFile(params['name'], params['filename'],
+                                     headers.get('content-type', 'application/octet-stream'), self.spool_size)
+        else:
+            self.part = FieldPart(params['name'])
+
+    def finish_part(self):
+        if isinstance(self.part, UploadedFile):
+            self.part.seek(0)
+            value = self.part
+        else:
+            value = self.part.value(self.charset)
+
+        if self.part.name in self.fields:
+            previous = self.fields[self.part.name]
+            self.fields[self.part.name] = (previous if isinstance(previous, list) else [previous]) + [value]
+        else:
+            self.fields[self.part.name] = value
+        self.part = None
+
+
+class FieldPart:
+    """Regular (non-file) form field, kept in memory"""
+
+    def __init__(self, name):
+        self.name = name
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(data)
+
+    def value(self, charset):
+        return b''.join(self.chunks).decode(charset)
+
+
+def parse_content_type(header):
+    """Split a Content-Type-like header into its value and a dict of parameters"""
+    value, *params = header.split(';')
+    parsed_params = {}
+    for param in params:
+        if '=' in param:
+            k, v = param.split('=', 1)
+            parsed_params[k.strip().lower()] = v.strip().strip('"')
+    return value.strip().lower(), parsed_params
@@ -0,0 +1,177 @@
+"""
+    east.profiling
+    ==============
+    On-demand request profiling: a sampled fraction of requests, or those
+    carrying a secret trigger header, run under cProfile, with the stats
+    aggregated per route and optionally written to a directory
+
+    :copyright: (c) 2016 by Zvonimir Jurelinac
+    :license: MIT
+"""
+
+import cProfile
+import concurrent.futures
+import hmac
+import io
+import os
+import pstats
+import random
+import re
+import threading
+import time
+
+from east.metrics import UNMATCHED_ROUTE
+from east.structures import environ_header_key
+
+
+TRIGGER_HEADER = 'X-East-Profile'
+REPORT_LIMIT = 30
+
+
+class Profiler:
+    """Per-request cProfile runner
+
+    A request is profiled with probability `sample_rate`, or when its
+    `trigger_header` equals `secret`. Stats of profiled requests are merged
+    per (route, method); with `directory` set, every profiled request is
+    also dumped there as a `.prof` file, loadable with `pstats`.
+
+    Only one request is profiled at a time, as cProfile cannot run
+    concurrently; requests selected while another one is being profiled are
+    served without profiling.
+    """
+
+    def __init__(self, sample_rate=0.0, secret=None, trigger_header=TRIGGER_HEADER, directory=None):
+        self.sample_rate = sample_rate
+        self.secret = secret
+        self.trigger_header = trigger_header
+        self.directory = directory
+        self.stats = {}
+        self.counts = {}
+        self._lock = threading.Lock()
+        self._profiling = threading.Lock()
+
+    @property
+    def trigger_header(self):
+        return self._trigger_header
+
+    @trigger_header.setter
+    def trigger_header(self, value):
+        self._trigger_header = value
+        self._trigger_key = environ_header_key(value)
+
+    def should_profile(self, environ):
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        return self.is_authorized(environ)
+
+    def is_authorized(self, environ):
+        """Return True if the request carries the secret in the trigger header"""
+        if not self.secret:
+            return False
+        value = environ.get(self._trigger_key)
+        return value is not None and hmac.compare_digest(value.encode('latin-1'), self.secret.encode('latin-1'))
+
+    def profile(self, context):
+        """Run `context.execute` under the profiler, unless another request is being profiled"""
+        if not self._profiling.acquire(blocking=False):
+            return context.execute()
+        try:
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(context.execute)
+            finally:
+                self.collect(context, profile)
+        finally:
+            self._profiling.release()
+
+    async def profile_async(self, context):
+        """Run `context.execute_async` under the profiler
+
+        The profiler records everything running on the event loop thread while
+        the request is in progress, including other requests served
+        concurrently on the same event loop. Calls the request makes in the
+        context executor, such as sync endpoints, are profiled in their thread.
+        """
+        if not self._profiling.acquire(blocking=False):
+            return await context.execute_async()
+        executor = context.executor
+        context.executor = ProfilingExecutor(executor)
+        try:
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                return await context.execute_async()
+            finally:
+                profile.disable()
+                self.collect(context, profile, *context.executor.profiles)
+        finally:
+            context.executor = executor
+            self._profiling.release()
+
+    def collect(self, context, *profiles):
+        """Merge the request profiles into its route stats, and dump them if a directory is set"""
+        route = context.route.url_rule if context.route is not None else UNMATCHED_ROUTE
+        key = (route, context.environ.get('REQUEST_METHOD'))
+
+        for profile in profiles:
+            profile.create_stats()
+        with self._lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                self.stats[key] = pstats.Stats(*profiles)
+            else:
+                stats.add(*profiles)
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            filename = '%s.%s.%d.prof' % (key[1], slugify(route), time.time_ns())
+            pstats.Stats(*profiles).dump_stats(os.path.join(self.directory, filename))
+
+    def report(self, route=None, limit=REPORT_LIMIT, sort='cumulative'):
+        """Return the aggregated stats as text, for all routes or those matching `route`"""
+        output = io.StringIO()
+        with self._lock:
+            for (url_rule, method), stats in sorted(self.stats.items()):
+                if route is not None and url_rule != route:
+                    continue
+                output.write('==== %s %s, %d requests ====\n' % (method, url_rule, self.counts[url_rule, method]))
+                stats.stream = output
+                stats.sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+            self.counts.clear()
+
+
+class ProfilingExecutor(concurrent.futures.Executor):
+    """Executor wrapper running each submitted call under its own profiler,
+    collected in `profiles`"""
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.profiles = []
+
+    def submit(self, fn, *args, **kwargs):
+        return self.executor.submit(self.run, fn, args, kwargs)
+
+    def run(self, fn, args, kwargs):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ profiles all threads with the already enabled profiler
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+            self.profiles.append(profile)
+
+
+def slugify(url_rule):
+    """Turn a URL rule into a string usable in a file name"""
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', url_rule).strip('_') or 'root'
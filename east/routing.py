@@ -7,45 +7,118 @@
     :license: MIT
 """
 
+import functools
 import inspect
 import re
+import threading
 
+from collections import namedtuple
+from time import perf_counter
+
+from east.coalescing import SingleFlight
+from east.concurrency import is_async_callable, run_in_executor, run_sync
 from east.exceptions import *
 
 
+HTTP_METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+BODY_METHODS = frozenset(('POST', 'PUT', 'PATCH'))
+RESOURCE_LIFECYCLES = ('request', 'singleton', 'thread')
+
+
 class Resource:
-    """REST API Resource representation"""
+    """REST API Resource representation
+
+    By default, a new instance is created for every request. Resources that
+    hold expensive state can set `lifecycle` to `singleton`, for a single
+    instance created at registration and shared by all threads, or to
+    `thread`, for one instance per serving thread.
+
+    Subclasses may override `__call__` to customize the dispatch, under ASGI
+    it is then called in the context executor, like a regular endpoint.
+    """
+    lifecycle = 'request'
 
     def __call__(self, context):
         """Dispatches a request (wrapped in context) to the proper resource method"""
-        method = context.request.method.lower()
-        if not hasattr(self, method):
-            raise HTTPMethodNotAllowed('`%s` does not support %s method' % (self.__class__.__name__, method.upper()))
+        plan = context.route.plans.get(context.request.method)
+        if plan is None:
+            raise self.method_not_allowed(context)
+
+        return plan.execute(context, self)
 
-        return dispatch_to_endpoint(getattr(self, method), context)
+    @classmethod
+    def method_not_allowed(cls, context):
+        return HTTPMethodNotAllowed('`%s` does not support %s method' % (cls.__name__, context.request.method),
+                                    headers={'Allow': context.route.allow})
 
-    def list_methods(self):
-        pass
+    @classmethod
+    def list_methods(cls):
+        """Return HTTP methods supported by the resource"""
+        return [method for method in HTTP_METHODS if hasattr(cls, method.lower())]
 
 
 class Route:
     """Single route representation"""
     _separator_pattern = re.compile('(<|:|>)')
-    _type_regexes = {'int': '[0-9]+', 'string': '[^\]+', 'path': '.+'}
+    _type_regexes = {'int': '[0-9]+', 'string': '[^/]+', 'path': '.+'}
     _type_parsers = {'int': int, 'string': str, 'path': str}
 
-    def __init__(self, endpoint, url_rule, methods=['GET']):
+    def __init__(self, endpoint, url_rule, methods=['GET'], max_body_size=None, codecs=None, coalesce=False):
         self.endpoint = endpoint
         self.url_rule = url_rule
         self.methods = [x.upper() for x in methods] if methods is not None else None
-        self.raw_regex, self.adapted_regex, self.url_parameters = Route.make_regex(url_rule)
-        self.compiled_regex = re.compile(self.raw_regex)
+        self.max_body_size = max_body_size
+        self.single_flight = SingleFlight(() if coalesce is True else coalesce) if coalesce else None
+        _, self.url_parameters = Route.make_regex(url_rule)
+        self.is_resource = inspect.isclass(endpoint) and issubclass(endpoint, Resource)
+
+        if self.is_resource:
+            self.plan = None
+            self.plans = {method: DispatchPlan.build(getattr(endpoint, method.lower()), self.url_parameters,
+                                                     skip_self=True, codecs=codecs)
+                          for method in endpoint.list_methods()}
+            if 'GET' in self.plans and self.plans['GET'].formatter.serves_head:
+                self.plans.setdefault('HEAD', self.plans['GET'])
+            self.allow = ', '.join(self.plans)
+            self.get_instance = Route.make_instance_getter(endpoint)
+        else:
+            self.plan = DispatchPlan.build(endpoint, self.url_parameters, codecs=codecs)
+            self.plans = {}
+            if self.methods is None:
+                self.methods = ['GET']
+            if 'GET' in self.methods and 'HEAD' not in self.methods and self.plan.formatter.serves_head:
+                self.methods.append('HEAD')
+            self.allow = ', '.join(self.methods)
+            self.get_instance = None
+
+    @staticmethod
+    def make_instance_getter(resource):
+        """Return a function providing the resource instance serving a request,
+        according to the resource lifecycle"""
+        if resource.lifecycle == 'request':
+            return resource
+        elif resource.lifecycle == 'singleton':
+            instance = resource()
+            return lambda: instance
+        elif resource.lifecycle == 'thread':
+            local = threading.local()
+
+            def get_instance():
+                try:
+                    return local.instance
+                except AttributeError:
+                    local.instance = resource()
+                    return local.instance
+            return get_instance
+        raise ValueError('Unknown lifecycle `%s` of resource `%s`, expected one of %s' %
+                         (resource.lifecycle, resource.__name__, ', '.join(RESOURCE_LIFECYCLES)))
 
     @staticmethod
     def make_regex(url_rule):
-        """"""
+        """Return the regular expression matching the URL rule, with a named
+        group per URL parameter, and the types of the parameters"""
         rule_tokens = Route._separator_pattern.split(url_rule)
-        parsed_tokens, adapted_tokens = [], []
+        parsed_tokens = []
         url_parameters = {}
         var_name_next, var_type_next = False, False
         last_var_type = None
@@ -61,22 +134,123 @@ class Route:
                 var_type_next = False
             elif var_name_next:
                 parsed_tokens.append('(?P<%s>%s)' % (token, Route._type_regexes[last_var_type]))
-                adapted_tokens.append('(?:%s)' % Route._type_regexes[last_var_type])
                 url_parameters[token] = last_var_type
                 var_name_next = False
             else:
-                parsed_tokens.append(token)
-                adapted_tokens.append(token)
-        return ''.join(parsed_tokens), ''.join(adapted_tokens), url_parameters
+                parsed_tokens.append(re.escape(token))
+        return ''.join(parsed_tokens), url_parameters
 
-    def encode_methods(self):
-        """"""
-        return r'\[(?:%s)\]' % '|'.join(self.methods) if self.methods is not None else r'\[.+\]'
+    def make_segments(self):
+        """Split the URL rule into path segments, each being either a static
+        string, a single `(type, name)` parameter, or a mixed segment regex"""
+        segments = self.url_rule[1:].split('/') if self.url_rule.startswith('/') else self.url_rule.split('/')
+        parsed = []
+        for segment in segments:
+            _, url_parameters = Route.make_regex(segment)
+            if not url_parameters:
+                parsed.append(('static', segment))
+            elif len(url_parameters) == 1 and segment.startswith('<') and segment.endswith('>') \
+                    and segment.count('<') == 1:
+                name, var_type = next(iter(url_parameters.items()))
+                parsed.append((var_type, name))
+            elif 'path' in url_parameters.values():
+                # A `path` parameter glued to other text may span several segments,
+                # so the rest of the rule is matched as a single regular expression
+                parsed.append(('tail', '/'.join(segments[len(parsed):])))
+                break
+            else:
+                parsed.append(('pattern', segment))
+        return parsed
 
-    def parse_url_parameters(self, url):
-        """"""
-        return {k: self._type_parsers[self.url_parameters[k]](v) for k, v
-                in self.compiled_regex.match(url).groupdict().items()}
+    def dispatch(self, context):
+        """Dispatch the request to the route endpoint and return the response,
+        sharing it between identical concurrent GET requests if coalescing is on"""
+        if self.single_flight is not None and context.request.method == 'GET':
+            return self.single_flight.call(context, self.dispatch_endpoint)
+        return self.dispatch_endpoint(context)
+
+    async def dispatch_async(self, context):
+        """Asynchronous counterpart of `dispatch`, used when serving over ASGI"""
+        if self.single_flight is not None and context.request.method == 'GET':
+            return await self.single_flight.call_async(context, self.dispatch_endpoint_async)
+        return await self.dispatch_endpoint_async(context)
+
+    def dispatch_endpoint(self, context):
+        if self.is_resource:
+            return self.get_instance()(context)
+        return self.plan.execute(context)
+
+    async def dispatch_endpoint_async(self, context):
+        if self.is_resource:
+            if self.endpoint.__call__ is not Resource.__call__:
+                return await run_in_executor(context.executor, self.dispatch_endpoint, context)
+            plan = self.plans.get(context.request.method)
+            if plan is None:
+                raise self.endpoint.method_not_allowed(context)
+            # The instance is obtained in the thread running the method, for per-thread resources
+            return await plan.execute_async(context, get_instance=self.get_instance)
+        return await self.plan.execute_async(context)
+
+    def accepts(self, method):
+        """Check whether the route accepts the given HTTP method"""
+        return self.methods is None or method in self.methods
+
+
+class RouteNode:
+    """Single node of the routing trie, representing one path segment"""
+
+    def __init__(self):
+        self.static = {}
+        self.dynamic = []
+        self.routes = []
+        self.min_index = None
+
+    def child(self, kind, key):
+        """Return the child node for an edge, creating it if necessary"""
+        if kind == 'static':
+            return self.static.setdefault(key, RouteNode())
+
+        for edge in self.dynamic:
+            if edge.kind == kind and edge.key == key:
+                return edge.node
+
+        edge = RouteEdge(kind, key)
+        self.dynamic.append(edge)
+        return edge.node
+
+    def update_index(self, index):
+        if self.min_index is None or index < self.min_index:
+            self.min_index = index
+
+
+class RouteEdge:
+    """Typed (non-static) edge of the routing trie"""
+
+    def __init__(self, kind, key):
+        self.kind = kind
+        self.key = key
+        self.node = RouteNode()
+        self.regex = None
+        self.parsers = None
+
+        if kind in ('pattern', 'tail'):
+            raw_regex, url_parameters = Route.make_regex(key)
+            self.regex = re.compile(raw_regex)
+            self.parsers = {k: Route._type_parsers[v] for k, v in url_parameters.items()}
+        elif kind not in Route._type_parsers:
+            raise ValueError('Unknown URL parameter type `%s`' % kind)
+
+    def convert(self, value):
+        """Convert a single segment according to the edge type, or return
+        `_no_match` if the segment does not fit it"""
+        if self.kind == 'int':
+            return int(value) if value.isdigit() and value.isascii() else _no_match
+        elif self.kind == 'pattern':
+            match = self.regex.fullmatch(value)
+            if match is None:
+                return _no_match
+            return {k: self.parsers[k](v) for k, v in match.groupdict().items()}
+        return value if value else _no_match
 
 
 class Region:
@@ -85,55 +259,234 @@ class Region:
 
 
 class Router:
-    """Routing provider"""
+    """Routing provider
 
-    def __init__(self):
+    Routes are stored in a trie of URL path segments. Static segments are
+    resolved with a single dictionary lookup, while URL parameters form typed
+    edges which convert the values during the descent. When several routes
+    match the same URL, the one registered first wins.
+
+    If `cache_size` is given, resolutions (including failed ones) are kept in
+    a bounded LRU cache keyed by method and URL, which is cleared whenever a
+    new route is added.
+    """
+
+    def __init__(self, cache_size=None):
         self.routes = []
-        self._matcher = None
+        self._root = RouteNode()
+        self._cache_size = cache_size
+        self._lookup = (functools.lru_cache(maxsize=cache_size)(self._find)
+                        if cache_size else self._find)
 
-    def add_route(self, endpoint, url_rule, methods):
+    def add_route(self, endpoint, url_rule, methods, **options):
         """"""
-        route = Route(endpoint, url_rule, methods)
+        route = Route(endpoint, url_rule, methods, **options)
+        index = len(self.routes)
         self.routes.append(route)
 
-    def initialize(self):
-        """"""
-        combined_regex = '|'.join([r'(%s%s)' % (route.encode_methods(), route.adapted_regex) for route in self.routes])
-        self._matcher = re.compile(combined_regex)
+        node = self._root
+        node.update_index(index)
+        for kind, key in route.make_segments():
+            node = node.child(kind, key)
+            node.update_index(index)
+            if kind == 'tail':
+                break
+        node.routes.append((index, route))
+
+        self.clear_cache()
 
     def match(self, url, method):
-        """"""
-        if self._matcher is None:
-            self.initialize()
-        match = self._matcher.fullmatch('[%s]%s' % (method.upper(), url))
+        """Find the endpoint for the URL and method, and extract URL parameters"""
+        route, url_parameters = self.resolve(url, method)
+        return route.endpoint, url_parameters
 
-        if match is not None:
-            match_route = self.routes[[i for i, u in enumerate(match.groups()) if u is not None][0]]
-            return match_route.endpoint, match_route.parse_url_parameters(url)
-        else:
+    def resolve(self, url, method):
+        """Find the route for the URL and method, and extract URL parameters"""
+        result = self._lookup(method.upper(), url)
+
+        if result is None:
             raise HTTPNotFound('Cannot resolve route')
 
+        route, url_parameters = result
+        return route, dict(url_parameters)
+
+    def cache_info(self):
+        """Return route cache statistics (hits, misses, maxsize, currsize), or None
+        if the cache is disabled"""
+        return self._lookup.cache_info() if self._cache_size else None
+
+    def clear_cache(self):
+        """Drop all cached route resolutions, including cached misses"""
+        if self._cache_size:
+            self._lookup.cache_clear()
+
+    def _find(self, method, url):
+        """Resolve the route from the trie, returning None if there is no match"""
+        segments = url[1:].split('/') if url.startswith('/') else url.split('/')
+        result = self._search(self._root, segments, 0, method, {}, None)
+        return result[1:] if result is not None else None
+
+    def _search(self, node, segments, position, method, url_parameters, best):
+        """Depth-first trie search, keeping only the earliest registered match"""
+        if best is not None and (node.min_index is None or node.min_index >= best[0]):
+            return best
+
+        if position == len(segments):
+            for index, route in node.routes:
+                if best is not None and index >= best[0]:
+                    break
+                if route.accepts(method):
+                    return index, route, url_parameters
+            return best
+
+        segment = segments[position]
+        child = node.static.get(segment)
+        if child is not None:
+            best = self._search(child, segments, position + 1, method, url_parameters, best)
+
+        for edge in node.dynamic:
+            if edge.kind == 'path':
+                for end in range(len(segments), position, -1):
+                    value = '/'.join(segments[position:end])
+                    if value:
+                        best = self._search(edge.node, segments, end, method,
+                                            dict(url_parameters, **{edge.key: value}), best)
+            elif edge.kind == 'tail':
+                match = edge.regex.fullmatch('/'.join(segments[position:]))
+                if match is not None:
+                    params = {k: edge.parsers[k](v) for k, v in match.groupdict().items()}
+                    best = self._search(edge.node, segments, len(segments), method,
+                                        dict(url_parameters, **params), best)
+            else:
+                value = edge.convert(segment)
+                if value is _no_match:
+                    continue
+                params = dict(url_parameters, **value) if edge.kind == 'pattern' else \
+                    dict(url_parameters, **{edge.key: value})
+                best = self._search(edge.node, segments, position + 1, method, params, best)
+
+        return best
+
+
+_no_match = object()
+
+
+PlanParameter = namedtuple('PlanParameter', 'name default converter from_url')
+
+
+class DispatchPlan(namedtuple('DispatchPlan', 'endpoint parameters formatter is_async')):
+    """Immutable, precompiled recipe for dispatching a request to an endpoint
+
+    Holds everything `inspect` would otherwise have to be asked on every
+    request: parameter names, defaults and converters, whether the value
+    comes from the URL or from the query/body, and the response formatter.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def build(cls, endpoint, url_parameters=(), skip_self=False, codecs=None):
+        """Inspect the endpoint and build its dispatch plan"""
+        from east.types import ResponseType
+
+        parameters = list(inspect.signature(endpoint).parameters.values())
+        if skip_self:
+            parameters = parameters[1:]
+
+        plan_parameters = tuple(PlanParameter(
+            param.name,
+            param.default if param.default is not inspect.Parameter.empty else None,
+            param.annotation if param.annotation is not inspect.Parameter.empty else None,
+            param.name in url_parameters
+        ) for param in parameters)
+
+        formatter = getattr(endpoint, '__annotations__', {}).get('return')
+        if inspect.isclass(formatter) and issubclass(formatter, ResponseType):
+            formatter = formatter()
+        if not isinstance(formatter, ResponseType):
+            raise UnexpectedResponseType('Endpoint `%s` must declare a response type as its return annotation'
+                                         % endpoint.__qualname__)
+        if codecs is not None:
+            formatter = formatter.bind(codecs)
+
+        return cls(endpoint, plan_parameters, formatter, is_async_callable(endpoint))
+
+    def execute(self, context, instance=None):
+        """Collect parameters from the request, invoke the endpoint and format its output"""
+        params = self.timed_collect_params(context)
+        output = self.endpoint(instance, **params) if instance is not None else self.endpoint(**params)
+        return self.format_output(run_sync(output) if self.is_async else output)
+
+    async def execute_async(self, context, instance=None, get_instance=None):
+        """Asynchronous counterpart of `execute`
+
+        Coroutine endpoints are awaited, while regular ones are run in the
+        context executor so they do not block the event loop. For resource
+        methods, `get_instance` may be given instead of the `instance`, to be
+        called in the thread running the method.
+        """
+        params = self.timed_collect_params(context)
+        if self.is_async:
+            if get_instance is not None:
+                instance = get_instance()
+            args = (instance,) if instance is not None else ()
+            output = await self.endpoint(*args, **params)
+        else:
+            output = await run_in_executor(context.executor, self.call, instance, get_instance, params)
+        return self.format_output(output)
+
+    def call(self, instance, get_instance, params):
+        if get_instance is not None:
+            instance = get_instance()
+        return self.endpoint(instance, **params) if instance is not None else self.endpoint(**params)
+
+    def timed_collect_params(self, context):
+        """Collect the parameters, timing it as a part of the `parse` phase, as
+        the query arguments and the body are parsed lazily, on first access"""
+        started = perf_counter()
+        params = self.collect_params(context)
+        context.record_nested_phase('parse', 'dispatch', started)
+        return params
+
+    def collect_params(self, context):
+        """Gather and convert endpoint parameter values from the request"""
+        request = context.request
+        url_parameters = request.url_parameters
+        has_body = request.method in BODY_METHODS
+
+        params = {}
+        for name, default, converter, from_url in self.parameters:
+            if from_url:
+                value = url_parameters[name]
+            else:
+                value = request.args.get(name)
+                if value is None and has_body:
+                    body = request.body
+                    value = body.get(name) if isinstance(body, dict) else None
+            if value is None:
+                value = default
+                if value is None:
+                    raise HTTPBadRequest('Required parameter `%s` is missing from the request' % name)
+            if converter is not None:
+                try:
+                    value = converter(value)
+                except (TypeError, ValueError) as e:
+                    raise HTTPBadRequest('Invalid value for parameter `%s`: %s' % (name, e))
+            params[name] = value
+        return params
+
+    def format_output(self, output):
+        """Format endpoint output (optionally an `(output, status)` tuple) as a response"""
+        status = 200
+        if isinstance(output, tuple):
+            output, status = output
+        return self.formatter.format(output, status)
+
 
 def dispatch_to_endpoint(endpoint, context):
     """Handles dispatching of a request to the endpoint
 
     This includes parsing and validating request arguments, invoking endpoint
-    function/method and formatting the output result.
+    function/method and formatting the output result. Routes use their
+    precompiled plans, this is meant for dispatching to arbitrary callables.
     """
-    params = {}
-    for param in inspect.signature(endpoint).parameters.values():
-        default = param.default if param.default is not inspect._empty else None
-        raw_value = context.retrieve_param(param.name) or default
-        if raw_value is None:
-            raise HTTPBadRequest('Required parameter `%s` is missing from the request' % param)
-        params[param.name] = param.annotation(raw_value)
-
-    output_type = endpoint.__annotations__['return']
-    if inspect.isclass(output_type):
-        output_type = output_type()
-
-    output = endpoint(**params)
-    status = 200
-    if isinstance(output, tuple):
-        output, status = output
-    return output_type.format(output, status)
+    return DispatchPlan.build(endpoint).execute(context)
@@ -0,0 +1,361 @@
+"""
+    east.server
+    ===========
+    Built-in HTTP server: a single process, or a prefork master supervising
+    worker processes, each serving the app with gevent or, when gevent is not
+    installed, the standard library WSGI server
+
+    :copyright: (c) 2016 by Zvonimir Jurelinac
+    :license: MIT
+"""
+
+import errno
+import os
+import select
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler
+
+
+BACKLOG = 2048
+WORKER_CHECK_INTERVAL = 1.0
+MAX_RESTART_DELAY = 10.0
+
+
+def bind_socket(host, port, reuse_port=False):
+    """Create a listening TCP socket"""
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+def current_memory():
+    """Return the resident set size of the current process, in bytes"""
+    import resource  # Not available on Windows
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, IndexError, ValueError):
+        # Peak instead of current usage, in kilobytes on Linux and bytes on macOS
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Request handler leaving request logging to the app access log"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadingWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    """Standard library WSGI server handling each connection in a daemon
+    thread, `join_requests` waits for the in-flight requests to finish"""
+    daemon_threads = True
+    block_on_close = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.request_threads = set()
+        self._threads_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        thread = threading.Thread(target=self.process_request_thread, args=(request, client_address), daemon=True)
+        with self._threads_lock:
+            self.request_threads.add(thread)
+        thread.start()
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            with self._threads_lock:
+                self.request_threads.discard(threading.current_thread())
+
+    def join_requests(self, timeout):
+        """Wait up to `timeout` seconds for the in-flight requests, return the
+        number of those still running"""
+        deadline = time.monotonic() + timeout
+        with self._threads_lock:
+            threads = list(self.request_threads)
+        for thread in threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+        return sum(thread.is_alive() for thread in threads)
+
+
+class StdlibBackend:
+    """Serves the app with the standard library WSGI server"""
+    name = 'wsgiref'
+
+    def __init__(self, app, sock, logger):
+        host, port = sock.getsockname()[:2]
+        self.server = ThreadingWSGIServer((host, port), QuietRequestHandler, bind_and_activate=False)
+        self.server.socket.close()
+        self.server.socket = sock
+        self.server.server_name, self.server.server_port = socket.getfqdn(host), port
+        self.server.setup_environ()
+        self.server.set_app(app)
+        self.logger = logger
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='east-server', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout):
+        """Stop accepting connections and wait up to `timeout` for the in-flight
+        requests, those still running are abandoned with their daemon threads"""
+        self.server.shutdown()
+        self.server.server_close()
+        unfinished = self.server.join_requests(timeout)
+        if unfinished:
+            self.logger.warning('Graceful timeout expired, abandoning %d in-flight requests' % unfinished)
+
+    def on_signal(self, signum, handler):
+        signal.signal(signum, lambda *args: handler())
+
+    sleep = staticmethod(time.sleep)
+
+
+class GeventBackend:
+    """Serves the app with the gevent WSGI server"""
+    name = 'gevent'
+
+    def __init__(self, app, sock, logger):
+        from gevent.pywsgi import WSGIServer as GeventWSGIServer
+        self.server = GeventWSGIServer(sock, app, log=None, error_log=logger)
+
+    def start(self):
+        self.server.start()
+
+    def stop(self, timeout):
+        """Stop accepting connections and wait up to `timeout` for the in-flight requests"""
+        self.server.stop(timeout=timeout)
+
+    def on_signal(self, signum, handler):
+        import gevent
+        gevent.signal_handler(signum, handler)
+
+    @staticmethod
+    def sleep(seconds):
+        import gevent
+        gevent.sleep(seconds)
+
+
+def server_backend():
+    """Return the gevent server backend if gevent is installed, the standard library one otherwise"""
+    try:
+        import gevent.pywsgi
+        return GeventBackend
+    except ImportError:
+        return StdlibBackend
+
+
+class Worker:
+    """Serves requests from the listening socket until stopped
+
+    A worker stops gracefully, finishing in-flight requests, on SIGTERM or
+    SIGINT, once it has served `max_requests` requests, once its memory use
+    exceeds `max_memory` bytes, or when its master process is gone.
+    """
+
+    def __init__(self, app, sock, max_requests=None, max_memory=None, graceful_timeout=30, backend=None):
+        self.app = app
+        self.sock = sock
+        self.max_requests = max_requests
+        self.max_memory = max_memory
+        self.graceful_timeout = graceful_timeout
+        self.backend = (backend or server_backend())(self.serve, sock, app.logger)
+        self.requests = 0
+        self.stopping = False
+        self.ppid = os.getppid()
+
+    def serve(self, environ, start_response):
+        self.requests += 1
+        if self.max_requests is not None and self.requests >= self.max_requests:
+            self.stopping = True
+        return self.app(environ, start_response)
+
+    def stop(self):
+        self.stopping = True
+
+    def run(self, supervised=False):
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            self.backend.on_signal(signum, self.stop)
+
+        self.backend.start()
+        self.app.logger.info('Worker %d serving with %s' % (os.getpid(), self.backend.name))
+        while not self.stopping:
+            self.backend.sleep(WORKER_CHECK_INTERVAL)
+            if supervised and os.getppid() != self.ppid:
+                self.app.logger.warning('Master process is gone, worker %d stopping' % os.getpid())
+                self.stopping = True
+            elif self.max_memory is not None and current_memory() > self.max_memory:
+                self.app.logger.info('Worker %d exceeded the memory limit, recycling' % os.getpid())
+                self.stopping = True
+
+        self.backend.stop(self.graceful_timeout)
+        self.app.close()
+
+
+class Arbiter:
+    """Prefork master process
+
+    Binds the listening socket once (or, with `reuse_port`, lets each worker
+    bind its own with SO_REUSEPORT), forks `workers` worker processes and
+    replaces those which exit, whether recycled or crashed. On SIGTERM or
+    SIGINT, workers are asked to stop and given `graceful_timeout` seconds to
+    drain in-flight requests before being killed.
+
+    Each worker has its own app state, so metrics, caches and profiler
+    stats are per worker.
+    """
+
+    def __init__(self, app, host, port, workers, max_requests=None, max_memory=None, graceful_timeout=30,
+                 reuse_port=False):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.worker_count = workers
+        self.max_requests = max_requests
+        self.max_memory = max_memory
+        self.graceful_timeout = graceful_timeout
+        self.reuse_port = reuse_port
+
+        self.sock = None
+        self.workers = {}
+        self.stopping = False
+        self.failures = 0
+        self._wakeup = None
+
+    def run(self):
+        if not self.reuse_port:
+            self.sock = bind_socket(self.host, self.port)
+        self.install_signals()
+        self.app.logger.info('Master %d listening on %s:%d, %d workers' %
+                             (os.getpid(), self.host, self.port, self.worker_count))
+
+        try:
+            while not self.stopping:
+                self.reap_workers()
+                self.spawn_workers()
+                self.wait(WORKER_CHECK_INTERVAL)
+        finally:
+            self.stop_workers()
+            if self.sock is not None:
+                self.sock.close()
+            self.app.logger.info('Shutting down... Bye bye!')
+
+    def install_signals(self):
+        self._wakeup = os.pipe()
+        for fd in self._wakeup:
+            os.set_blocking(fd, False)
+        signal.set_wakeup_fd(self._wakeup[1])
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        signal.signal(signal.SIGCHLD, lambda *args: None)
+
+    def handle_stop(self, signum, frame):
+        self.stopping = True
+
+    def wait(self, timeout):
+        """Sleep until a signal arrives or `timeout` passes"""
+        try:
+            select.select([self._wakeup[0]], [], [], timeout)
+            while os.read(self._wakeup[0], 64):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+
+    def spawn_workers(self):
+        delay = min(0.1 * 2 ** self.failures, MAX_RESTART_DELAY) if self.failures else 0
+        while len(self.workers) < self.worker_count and not self.stopping:
+            if delay:
+                self.wait(delay)
+            pid = os.fork()
+            if pid == 0:
+                self.run_worker()
+            self.workers[pid] = time.monotonic()
+
+    def run_worker(self):
+        """Serve requests in the forked child, never returning"""
+        exit_code = 0
+        try:
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+                signal.signal(signum, signal.SIG_DFL)
+            signal.set_wakeup_fd(-1)
+            for fd in self._wakeup:
+                os.close(fd)
+
+            sock = self.sock if self.sock is not None else bind_socket(self.host, self.port, reuse_port=True)
+            Worker(self.app, sock, self.max_requests, self.max_memory, self.graceful_timeout).run(supervised=True)
+        except BaseException:
+            self.app.logger.exception('Worker %d failed:' % os.getpid())
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def reap_workers(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+
+            started = self.workers.pop(pid, None)
+            exit_code = os.waitstatus_to_exitcode(status)
+            if exit_code == 0:
+                self.failures = 0
+            else:
+                self.app.logger.error('Worker %d exited with code %d' % (pid, exit_code))
+                lifetime = time.monotonic() - started if started is not None else 0
+                self.failures = self.failures + 1 if lifetime < WORKER_CHECK_INTERVAL else 0
+
+    def stop_workers(self):
+        """Ask the workers to stop, killing those still running after the graceful timeout"""
+        self.signal_workers(signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            self.reap_workers()
+            self.wait(0.1)
+        self.signal_workers(signal.SIGKILL)
+        while self.workers:
+            self.reap_workers()
+            self.wait(0.1)
+
+    def signal_workers(self, signum):
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signum)
+            except OSError as e:
+                if e.errno == errno.ESRCH:
+                    self.workers.pop(pid, None)
+
+
+def serve(app, host, port, workers=1, max_requests=None, max_memory=None, graceful_timeout=30, reuse_port=False):
+    """Serve the app, with a prefork master if more than one worker or worker
+    recycling is requested, otherwise in the current process"""
+    if workers > 1 or max_requests is not None or max_memory is not None:
+        Arbiter(app, host, port, workers, max_requests, max_memory, graceful_timeout, reuse_port).run()
+        return
+
+    sock = bind_socket(host, port)
+    try:
+        app.logger.info('Listening on %s:%d' % (host, port))
+        Worker(app, sock, graceful_timeout=graceful_timeout).run()
+        app.logger.info('Shutting down... Bye bye!')
+    finally:
+        sock.close()
@@ -7,8 +7,8 @@
     :license: MIT
 """
 
+import functools
 
-from collections import defaultdict
 from collections.abc import Mapping, MutableMapping
 
 from east.exceptions import *
@@ -18,6 +18,8 @@ from east.functions import make_list
 # Generic data structures
 
 class ImmutableDict(dict):
+    __slots__ = ()
+
     def __setitem__(self, key, value):
         raise ImmutableValueChange('Cannot modify ImmutableDict element value.')
 
@@ -26,71 +28,170 @@ class ImmutableDict(dict):
 
 
 class WSGIHeaders(Mapping, ImmutableDict):
-    """Case-insensitive WSGI HTTP headers dictionary. Read-only."""
+    """Case-insensitive WSGI HTTP headers dictionary. Read-only.
+
+    Nothing is done upfront: a header is looked up in the environ only when
+    it is asked for, and its structured value is parsed on first access and
+    memoized. Use `raw` to get the unparsed header string.
+    """
+    __slots__ = ('environ', '_parsed')
 
     def __init__(self, environ):
-        self.dict = {normalize_http_header(k[5:]): self.parse_header_value(v)
-                     for k, v in environ.items() if k.startswith('HTTP_')}
-        self.content_type = environ.get('CONTENT_TYPE', None)
-        self.content_length = int(environ.get('CONTENT_LENGTH', 0))
+        self.environ = environ
+        self._parsed = {}
 
     def __getitem__(self, key):
-        return self.dict[normalize_http_header(key)]
+        environ_key = environ_header_key(key)
+        try:
+            return self._parsed[environ_key]
+        except KeyError:
+            value = self._parsed[environ_key] = self.parse_header_value(self.environ[environ_key])
+            return value
 
     def __iter__(self):
-        return iter(self.dict)
+        for key, value in self.environ.items():
+            if key.startswith('HTTP_'):
+                yield normalize_http_header(key[5:].replace('_', '-').lower())
+            elif key in ('CONTENT_TYPE', 'CONTENT_LENGTH') and value:
+                yield normalize_http_header(key.replace('_', '-').lower())
 
     def __len__(self):
-        return len(self.dict)
+        return sum(1 for _ in self)
 
     def __contains__(self, key):
-        return normalize_http_header(key) in self.dict
+        return environ_header_key(key) in self.environ
+
+    def raw(self, key, default=None):
+        """Return the unparsed header value"""
+        return self.environ.get(environ_header_key(key), default)
+
+    @property
+    def content_type(self):
+        return self.environ.get('CONTENT_TYPE') or None
+
+    @property
+    def content_length(self):
+        return int(self.environ.get('CONTENT_LENGTH') or 0)
 
     def parse_header_value(self, header):
         header_values = []
         for value_item in header.split(','):
             value_item = value_item.strip()
             if '(' not in value_item:
-                value, *params = value_item.split(',')
-                value_item = HeaderValue(value)
-                value_item.params = {k.strip(): v.strip() for (k, v) in [x.split('=', 1) for x in params]}
+                value, *params = value_item.split(';')
+                value_item = HeaderValue(value.strip())
+                value_item.params = {k.strip(): v.strip() for (k, v) in [x.split('=', 1) for x in params if '=' in x]}
             header_values.append(value_item)
         return header_values[0] if len(header_values) == 1 else header_values or None
 
 
 class Headers(MutableMapping):
-    """Case-insensitive HTTP headers dictionary."""
+    """Case-insensitive HTTP headers dictionary.
+
+    Headers are stored as a flat list of `(name, value)` tuples, which is
+    handed to the server as is. Looking up a header returns the list of its
+    values, and assigning a list sets one header line per value.
+    """
+    __slots__ = ('header_list',)
 
     def __init__(self, headers=None):
-        self.store = defaultdict(list)
+        self.header_list = []
 
         if headers is not None:
-            self.store.update(headers)
+            for key, value in headers.items():
+                self[key] = value
+
+    @classmethod
+    def from_list(cls, header_list):
+        """Create headers from a list of `(name, value)` tuples, taking ownership of the list"""
+        headers = cls.__new__(cls)
+        headers.header_list = header_list
+        return headers
 
     def __getitem__(self, key):
-        return self.store[key]
+        key = key.lower()
+        values = [v for k, v in self.header_list if k.lower() == key]
+        if not values:
+            raise KeyError(key)
+        return values
 
     def __iter__(self):
-        return iter(self.store)
+        seen = set()
+        for k, _ in self.header_list:
+            if k.lower() not in seen:
+                seen.add(k.lower())
+                yield k
 
     def __len__(self):
-        return len(self.store)
+        return len({k.lower() for k, _ in self.header_list})
+
+    def __contains__(self, key):
+        key = key.lower()
+        return any(k.lower() == key for k, _ in self.header_list)
 
     def __setitem__(self, key, value):
-        self.store[key] = make_list(value)
+        self.discard(key)
+        for item in make_list(value):
+            self.header_list.append((key, str(item)))
 
     def __delitem__(self, key):
-        del self.store[key]
+        if not self.discard(key):
+            raise KeyError(key)
+
+    def add(self, key, value):
+        """Add a header line, keeping existing ones with the same name"""
+        self.header_list.append((key, str(value)))
+
+    def discard(self, key):
+        """Remove all lines of the header, returning True if there were any"""
+        key = key.lower()
+        length = len(self.header_list)
+        self.header_list[:] = [(k, v) for k, v in self.header_list if k.lower() != key]
+        return len(self.header_list) != length
 
     def as_list(self):
         """Return self represented as a list of key-value tuples"""
-        return [(normalize_http_header(k), ','.join(v)) for k, v in self.store.items()]
+        return self.header_list
 
 
 class HeaderValue(str):
     pass
 
 
+class ObjectPool:
+    """Bounded free list of reusable objects
+
+    `acquire` returns a released object reset with `reuse(*args)`, or a new
+    `factory(*args)` if there is none. Objects must not be used after being
+    released. Safe to share between threads and greenlets, as list `append`
+    and `pop` are atomic.
+    """
+    __slots__ = ('factory', 'size', '_free')
+
+    def __init__(self, factory, size):
+        self.factory = factory
+        self.size = size
+        self._free = []
+
+    def acquire(self, *args):
+        try:
+            obj = self._free.pop()
+        except IndexError:
+            return self.factory(*args)
+        return obj.reuse(*args)
+
+    def release(self, obj):
+        if len(self._free) < self.size:
+            self._free.append(obj)
+
+
+@functools.lru_cache(maxsize=512)
+def environ_header_key(header_name):
+    """Convert an HTTP header name to its WSGI environ key"""
+    key = header_name.upper().replace('-', '_')
+    return key if key in ('CONTENT_TYPE', 'CONTENT_LENGTH') else 'HTTP_' + key
+
+
 def normalize_http_header(header_name):
     UPPERCASE = ('http', 'dnt', 'xml')
     return '-'.join([x.upper() if x in UPPERCASE else x.capitalize() for x in header_name.split('-')])
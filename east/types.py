@@ -7,44 +7,101 @@
     :license: MIT
 """
 
+import email.utils
+import mimetypes
+import os
+import stat
+import threading
+import time
+
+from collections.abc import Iterator
+
+from east.codecs import default_codecs, jsondict_default
 from east.exceptions import *
-from east.http import Response
+from east.http import FileResponse, Response
+
+
+STREAM_CHUNK_SIZE = 16 * 1024
+STAT_CACHE_SIZE = 1024
 
 
 class ResponseType:
-    """Response type base class, contains format static method"""
+    """Response type base class, contains format static method
+
+    Routes serving GET with a response type having `serves_head` set also
+    serve HEAD, its responses leaving the body out.
+    """
+    serves_head = False
 
     def format(self, obj, status=200):
         raise NotImplementedError
 
+    def bind(self, codecs):
+        """Return the formatter prepared to use the application codecs"""
+        return self
+
 
 class JSON(ResponseType):
     """JSON response formatter
 
     Expects the return object to be either directly serializable as JSON,
-    or to implement a to_jsondict method.
+    or to implement a to_jsondict method. Iterators (e.g. generators), or any
+    iterable if `stream` is set, are sent incrementally as a JSON array.
     """
+    content_type = 'application/json'
 
-    def __init__(self, **kwargs):
+    def __init__(self, stream=False, codecs=None, **kwargs):
+        self.stream = stream
+        self.codecs = codecs if codecs is not None else default_codecs
         self.kwargs = kwargs
+        self.default = jsondict_default(**kwargs)
+
+    def bind(self, codecs):
+        return self.__class__(self.stream, codecs, **self.kwargs)
 
     def format(self, obj, status=200):
-        from east.functions import make_json
+        if self.stream or isinstance(obj, Iterator):
+            return Response(buffered(self.iter_items(obj)), status, content_type=self.content_type)
+        return Response(self.encode(obj), status, content_type=self.content_type)
+
+    def encode(self, obj):
         try:
-            encoded = make_json(obj)
-        except ValueError:
-            if hasattr(obj, 'to_jsondict'):
-                encoded = make_json(obj.to_jsondict(**self.kwargs))
-            else:
-                raise UnexpectedResponseType('%s cannot be converted to JSON format.' % obj)
-        finally:
-            return Response(encoded, status, content_type='application/json')
+            return self.codecs.encode(self.content_type, obj, self.default)
+        except UnexpectedResponseType:
+            raise
+        except (TypeError, ValueError) as e:
+            raise UnexpectedResponseType('%s cannot be converted to JSON format: %s' % (obj, e))
+
+    def iter_items(self, items):
+        yield b'['
+        separator = b''
+        for item in items:
+            yield separator
+            yield self.encode(item)
+            separator = b','
+        yield b']'
+
+
+class JSONLines(JSON):
+    """JSON Lines response formatter, streams each item of the returned
+    iterable as a single line of JSON"""
+    content_type = 'application/x-ndjson'
+
+    def format(self, obj, status=200):
+        return Response(buffered(self.iter_items(obj)), status, content_type=self.content_type)
+
+    def iter_items(self, items):
+        for item in items:
+            yield self.encode(item)
+            yield b'\n'
 
 
 class Str(ResponseType):
     """Plain text response formatter, converts the returned object to string"""
 
     def format(self, obj, status=200):
+        if isinstance(obj, Iterator):
+            return Response(buffered(str(chunk).encode('utf8') for chunk in obj), status)
         return Response(str(obj).encode('utf8'), status)
 
 
@@ -55,3 +112,60 @@ class Nothing(ResponseType):
         if obj is not None:
             raise TypeError('Incorrect response format, expected None')
         return Response('', status, content_type=None)
+
+
+class File(ResponseType):
+    """File response formatter, expects the path of the file to send
+
+    The file is streamed from disk, never loaded into memory as a whole, and
+    byte range and `If-Modified-Since` requests are supported. The content
+    type is guessed from the file name, unless `content_type` is given. File
+    size and modification time are cached for `stat_ttl` seconds, and checked
+    again on the opened file when it is served.
+    """
+    serves_head = True
+
+    def __init__(self, content_type=None, stat_ttl=1.0):
+        self.content_type = content_type
+        self.stat_ttl = stat_ttl
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def format(self, obj, status=200):
+        path = os.fspath(obj)
+        size, mtime, last_modified = self.stat(path)
+        content_type = self.content_type or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        return FileResponse(path, size, mtime, status, content_type, last_modified=last_modified)
+
+    def stat(self, path):
+        """Return the file size, modification time and its `Last-Modified` form, cached"""
+        now = time.monotonic()
+        cached = self._stats.get(path)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        try:
+            result = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            raise HTTPNotFound('Requested file was not found')
+        if not stat.S_ISREG(result.st_mode):
+            raise HTTPNotFound('Requested file was not found')
+
+        file_stat = (result.st_size, result.st_mtime, email.utils.formatdate(result.st_mtime, usegmt=True))
+        with self._lock:
+            if len(self._stats) >= STAT_CACHE_SIZE:
+                self._stats.clear()
+            self._stats[path] = (now + self.stat_ttl, file_stat)
+        return file_stat
+
+
+def buffered(chunks, size=STREAM_CHUNK_SIZE):
+    """Join small chunks of a streamed body into chunks of at least `size` bytes"""
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) >= size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
@@ -4,7 +4,7 @@ from east.ext.jwt import *
 
 app = East(__name__)
 
-jwt = EastJWT(lambda x: True)
+jwt = JWT('change-me')
 app.register_extension(jwt)
 
 todos = {}
@@ -0,0 +1,84 @@
+import asyncio
+import io
+import sys
+
+from east import East
+
+
+def new_app(**config):
+    """Create a test app, with debug output and access logging off unless configured"""
+    app = East('tests')
+    app.configure(**dict({'DEBUG': False, 'ACCESS_LOG': False}, **config))
+    return app
+
+
+def make_environ(path, method='GET', body=b'', content_type=None, headers=None, query_string=''):
+    """Build the WSGI environ of a request"""
+    environ = {'REQUEST_METHOD': method, 'PATH_INFO': path, 'QUERY_STRING': query_string,
+               'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'REMOTE_ADDR': '10.0.0.1',
+               'CONTENT_LENGTH': str(len(body)) if body else '', 'wsgi.input': io.BytesIO(body),
+               'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http'}
+    if content_type is not None:
+        environ['CONTENT_TYPE'] = content_type
+    for name, value in (headers or {}).items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = value
+    return environ
+
+
+def call(app, path, method='GET', body=b'', content_type=None, headers=None, query_string=''):
+    """Serve a request over WSGI, returning its status code, headers and body"""
+    result = {}
+    iterable = app(make_environ(path, method, body, content_type, headers, query_string),
+                   lambda status, response_headers: result.update(status=status, headers=dict(response_headers)))
+    try:
+        body = b''.join(iterable)
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+    return int(result['status'][:3]), result['headers'], body
+
+
+def make_scope(path, method='GET', content_type=None, headers=None, query_string=b'', type='http'):
+    """Build the ASGI scope of a request; `headers` may include Content-Length"""
+    raw_headers = [(name.lower().encode('latin-1'), str(value).encode('latin-1'))
+                   for name, value in (headers or {}).items()]
+    if content_type is not None:
+        raw_headers.append((b'content-type', content_type.encode('latin-1')))
+    return {'type': type, 'method': method, 'path': path, 'query_string': query_string, 'headers': raw_headers,
+            'client': ('10.0.0.1', 40000)}
+
+
+def body_messages(chunks):
+    """Return the ASGI messages carrying the body chunks"""
+    return [{'type': 'http.request', 'body': chunk, 'more_body': i < len(chunks) - 1}
+            for i, chunk in enumerate(chunks or [b''])]
+
+
+async def asgi_request(app, scope, messages):
+    """Run the ASGI app for the scope, receiving from (and consuming) the
+    `messages` list, and return the messages it sent"""
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent
+
+
+def asgi_response(sent):
+    """Return the status code, headers and body of the sent ASGI response messages"""
+    headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in sent[0]['headers']}
+    return sent[0]['status'], headers, b''.join(message.get('body', b'') for message in sent[1:])
+
+
+def call_asgi(app, path, method='GET', body=b'', content_type=None, headers=None, query_string=b''):
+    """Serve a request over ASGI, returning its status code, headers and body"""
+    headers = dict(headers or {})
+    if body:
+        headers.setdefault('Content-Length', len(body))
+    scope = make_scope(path, method, content_type, headers, query_string)
+    return asgi_response(asyncio.run(asgi_request(app, scope, body_messages([body]))))
@@ -0,0 +1,25 @@
+import io
+import json
+
+from east import Str
+
+from conftest import make_environ, new_app
+
+
+def test_streamed_response_logs_bytes_sent():
+    stream = io.StringIO()
+    app = new_app(ACCESS_LOG=True, ACCESS_LOG_STREAM=stream)
+
+    @app.route('/stream')
+    def stream_endpoint() -> Str:
+        return (chunk for chunk in ('a' * 100, 'b' * 50))
+
+    iterable = app(make_environ('/stream'), lambda status, headers: None)
+    assert len(next(iter(iterable))) > 0
+    iterable.close()
+    app.access_log.close()
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert len(records) == 1
+    assert records[0]['route'] == '/stream'
+    assert 0 < records[0]['response_bytes'] <= 150
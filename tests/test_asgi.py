@@ -0,0 +1,21 @@
+import asyncio
+
+from conftest import asgi_request, new_app
+
+
+def run(scope, messages):
+    return asyncio.run(asgi_request(new_app(), scope, messages))
+
+
+def test_websocket_connections_are_closed():
+    sent = run({'type': 'websocket', 'path': '/'}, [{'type': 'websocket.connect'}])
+    assert sent == [{'type': 'websocket.close', 'code': 1008}]
+
+
+def test_lifespan_startup_and_shutdown_complete():
+    sent = run({'type': 'lifespan'}, [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}])
+    assert [message['type'] for message in sent] == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+
+
+def test_unsupported_scopes_are_ignored():
+    assert run({'type': 'unknown'}, []) == []
@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+from east import JSON
+
+from conftest import asgi_request, asgi_response, body_messages, make_scope, new_app
+
+
+def make_app(**config):
+    app = new_app(**config)
+
+    @app.route('/items', methods=['POST'])
+    def create(name: str) -> JSON:
+        return {'name': name}
+
+    return app
+
+
+def post(app, chunks, content_length, path='/items'):
+    """POST the body chunks, returning the response status, body and the number of chunks left unreceived"""
+    messages = body_messages(chunks)
+    scope = make_scope(path, 'POST', 'application/json', {'Content-Length': content_length})
+    status, _, body = asgi_response(asyncio.run(asgi_request(app, scope, messages)))
+    return status, body, len(messages)
+
+
+def test_body_is_parsed():
+    body = json.dumps({'name': 'x' * 200000}).encode('utf8')
+    status, response_body, _ = post(make_app(MAX_REQUEST_BODY_SIZE=1024 * 1024),
+                                    [body[:100000], body[100000:]], len(body))
+    assert status == 200
+    assert json.loads(response_body) == {'name': 'x' * 200000}
+
+
+def test_body_over_content_length_limit_is_not_received():
+    status, _, unreceived = post(make_app(MAX_REQUEST_BODY_SIZE=100), [b'{}'], 1000)
+    assert status == 413
+    assert unreceived == 1
+
+
+def test_body_reading_stops_once_over_limit():
+    status, _, unreceived = post(make_app(MAX_REQUEST_BODY_SIZE=100), [b' ' * 60] * 10, 2)
+    assert status == 413
+    assert unreceived == 8
+
+
+def test_body_is_not_received_for_unknown_routes():
+    status, _, unreceived = post(make_app(), [b'{}'], 2, path='/missing')
+    assert status == 404
+    assert unreceived == 1
+
+
+def test_body_without_content_length_is_received():
+    app = make_app()
+    messages = body_messages([b'{"name": ', b'"hi"}'])
+    scope = make_scope('/items', 'POST', 'application/json')
+    status, _, body = asgi_response(asyncio.run(asgi_request(app, scope, messages)))
+    assert status == 200
+    assert json.loads(body) == {'name': 'hi'}
+
+
+def test_body_without_content_length_is_limited():
+    messages = body_messages([b' ' * 60] * 10)
+    scope = make_scope('/items', 'POST', 'application/json')
+    status, _, _ = asgi_response(asyncio.run(asgi_request(make_app(MAX_REQUEST_BODY_SIZE=100), scope, messages)))
+    assert status == 413
+    assert len(messages) == 8
@@ -0,0 +1,45 @@
+import json
+
+from east import JSON
+
+from conftest import call, call_asgi, new_app
+
+
+def make_app():
+    app = new_app(BATCH_ENDPOINT='/batch')
+
+    @app.route('/items/<int:item_id>')
+    def item(item_id: int) -> JSON:
+        return {'id': item_id}
+
+    @app.route('/items', methods=['POST'])
+    def create(name: str) -> JSON:
+        return {'name': name}
+
+    return app
+
+
+BATCH = json.dumps([{'path': '/items/1'}, {'method': 'POST', 'path': '/items', 'body': {'name': 'new'}},
+                    {'path': '/missing'}]).encode('utf8')
+RESULTS = [{'status': 200, 'body': {'id': 1}}, {'status': 200, 'body': {'name': 'new'}}]
+
+
+def test_batch_over_wsgi():
+    status, _, body = call(make_app(), '/batch', 'POST', BATCH, 'application/json')
+    assert status == 200
+    assert json.loads(body)[:2] == RESULTS
+    assert json.loads(body)[2]['status'] == 404
+
+
+def test_batch_over_asgi():
+    status, _, body = call_asgi(make_app(), '/batch', 'POST', BATCH, 'application/json')
+    assert status == 200
+    assert json.loads(body)[:2] == RESULTS
+    assert json.loads(body)[2]['status'] == 404
+
+
+def test_nested_batch_is_rejected():
+    nested = json.dumps([{'method': 'POST', 'path': '/batch', 'body': []}]).encode('utf8')
+    status, _, body = call_asgi(make_app(), '/batch', 'POST', nested, 'application/json')
+    assert status == 200
+    assert json.loads(body)[0]['status'] == 400
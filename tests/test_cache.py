@@ -0,0 +1,99 @@
+from east import JSON
+from east.ext.cache import ResponseCache
+
+from conftest import call, new_app
+
+
+def make_app(cache):
+    app = new_app()
+    app.register_extension(cache, 'cache')
+    calls = []
+
+    @app.route('/item/<int:n>')
+    @cache.cached(ttl=60)
+    def item(n) -> JSON:
+        calls.append(n)
+        return 'x' * 100
+
+    @app.route('/search')
+    @cache.cached(ttl=60, args=['q'], vary=['Accept-Language'])
+    def search() -> JSON:
+        calls.append('search')
+        return 'results'
+
+    return app, calls
+
+
+def test_hits_are_served_without_calling_the_endpoint():
+    cache = ResponseCache()
+    app, calls = make_app(cache)
+    first = call(app, '/item/1')
+    second = call(app, '/item/1')
+
+    assert calls == [1]
+    assert first[0] == second[0] == 200 and first[2] == second[2]
+    assert first[1]['ETag'] == second[1]['ETag']
+    assert second[1]['Cache-Control'] == 'max-age=60'
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_matching_if_none_match_gets_304():
+    app, calls = make_app(ResponseCache())
+    etag = call(app, '/item/1')[1]['ETag']
+
+    assert call(app, '/item/1', headers={'If-None-Match': etag})[::2] == (304, b'')
+    assert call(app, '/item/1', headers={'If-None-Match': 'W/' + etag})[0] == 304
+    assert call(app, '/item/1', headers={'If-None-Match': '"other"'})[0] == 200
+    assert calls == [1]
+
+
+def test_key_contains_selected_args_and_vary_headers():
+    app, calls = make_app(ResponseCache())
+    call(app, '/search', query_string='q=a&page=1')
+    call(app, '/search', query_string='q=a&page=2')
+    call(app, '/search', query_string='q=b')
+    call(app, '/search', query_string='q=a', headers={'Accept-Language': 'de'})
+    _, headers, _ = call(app, '/search', query_string='q=a', headers={'Accept-Language': 'de'})
+
+    assert calls == ['search'] * 3
+    assert headers['Vary'] == 'Accept-Language'
+
+
+def test_entries_are_evicted_least_recently_used_first_within_the_byte_budget():
+    entry_size = len(b'"' + b'x' * 100 + b'"') + len('http://localhost/item/1') + ResponseCache.ENTRY_OVERHEAD
+    cache = ResponseCache(max_bytes=entry_size * 2, max_entry_bytes=entry_size)
+    app, calls = make_app(cache)
+    call(app, '/item/1')
+    call(app, '/item/2')
+    call(app, '/item/1')
+    call(app, '/item/3')
+
+    assert cache._size <= cache.max_bytes
+    assert len(cache._entries) == 2
+    call(app, '/item/1')
+    call(app, '/item/2')
+    assert calls == [1, 2, 3, 2]
+
+
+def test_entries_over_the_entry_limit_are_not_stored():
+    cache = ResponseCache(max_bytes=1000, max_entry_bytes=100)
+    app, calls = make_app(cache)
+    call(app, '/item/1')
+    call(app, '/item/1')
+
+    assert calls == [1, 1]
+    assert cache._size == 0 and not cache._entries
+
+
+def test_invalidate_and_expiry_drop_entries():
+    cache = ResponseCache()
+    app, calls = make_app(cache)
+    call(app, '/item/1')
+    cache.invalidate()
+    assert cache._size == 0 and not cache._entries
+    call(app, '/item/1')
+
+    cache.storage.cached_endpoints = {f: policy._replace(ttl=0) for f, policy in cache.storage.cached_endpoints.items()}
+    call(app, '/item/2')
+    call(app, '/item/2')
+    assert calls == [1, 1, 2, 2]
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+
+from types import SimpleNamespace
+
+from east.coalescing import SingleFlight
+from east.http import Request, Response
+
+from conftest import make_environ
+
+
+def make_context(path='/items', **kwargs):
+    return SimpleNamespace(request=Request.parse_request(make_environ(path, **kwargs)))
+
+
+def run_concurrently(flight, dispatch, contexts):
+    """Call `flight.call` for each context in its own thread, the first one
+    being the leader, and return the results, or the raised exceptions"""
+    results = [None] * len(contexts)
+
+    def run(i):
+        try:
+            results[i] = flight.call(contexts[i], dispatch)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(contexts))]
+    threads[0].start()
+    dispatch.started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.2)
+    dispatch.release.set()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def make_dispatch(make_response):
+    def dispatch(context):
+        dispatch.calls.append(context)
+        dispatch.started.set()
+        dispatch.release.wait(5)
+        return make_response()
+
+    dispatch.calls = []
+    dispatch.started = threading.Event()
+    dispatch.release = threading.Event()
+    return dispatch
+
+
+def test_followers_share_a_copy_of_the_leader_response():
+    flight = SingleFlight()
+    dispatch = make_dispatch(lambda: Response(b'shared'))
+    results = run_concurrently(flight, dispatch, [make_context() for _ in range(4)])
+
+    assert len(dispatch.calls) == 1
+    assert [r.body for r in results] == [b'shared'] * 4
+    assert len({id(r) for r in results}) == 4
+    assert not flight._flights
+
+
+def test_leader_exception_is_raised_in_followers():
+    def fail():
+        raise ValueError('dispatch failed')
+
+    flight = SingleFlight()
+    dispatch = make_dispatch(fail)
+    results = run_concurrently(flight, dispatch, [make_context() for _ in range(3)])
+
+    assert len(dispatch.calls) == 1
+    assert all(isinstance(r, ValueError) for r in results)
+    assert not flight._flights
+
+
+def test_streamed_responses_are_not_shared():
+    flight = SingleFlight()
+    dispatch = make_dispatch(lambda: Response(iter([b'chunk'])))
+    results = run_concurrently(flight, dispatch, [make_context() for _ in range(3)])
+
+    assert len(dispatch.calls) == 3
+    assert [b''.join(r.body) for r in results] == [b'chunk'] * 3
+
+
+def test_requests_differing_in_key_are_not_coalesced():
+    flight = SingleFlight(headers=['Accept-Language'])
+    dispatch = make_dispatch(lambda: Response(b'ok'))
+    run_concurrently(flight, dispatch, [make_context(), make_context(query_string='page=2'),
+                                        make_context(headers={'Accept-Language': 'de'}),
+                                        make_context('/other')])
+    assert len(dispatch.calls) == 4
+
+
+def test_async_followers_share_the_response_and_the_exception():
+    async def main(make_response):
+        flight = SingleFlight()
+        release = asyncio.Event()
+        calls = []
+
+        async def dispatch(context):
+            calls.append(context)
+            await release.wait()
+            return make_response()
+
+        tasks = [asyncio.ensure_future(flight.call_async(make_context(), dispatch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        return calls, await asyncio.gather(*tasks, return_exceptions=True)
+
+    calls, results = asyncio.run(main(lambda: Response(b'shared')))
+    assert len(calls) == 1
+    assert [r.body for r in results] == [b'shared'] * 3
+
+    def fail():
+        raise ValueError('dispatch failed')
+
+    calls, results = asyncio.run(main(fail))
+    assert len(calls) == 1
+    assert all(isinstance(r, ValueError) for r in results)
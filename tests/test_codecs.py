@@ -0,0 +1,23 @@
+import json
+
+import pytest
+
+from east.codecs import CodecRegistry, encode_json_compact, jsondict_default
+from east.exceptions import UnexpectedResponseType
+
+
+def test_indent_is_respected():
+    for indent in (2, 4):
+        encoded = CodecRegistry(indent=indent).encode_json({'a': [1]})
+        assert encoded.decode('utf8') == json.dumps({'a': [1]}, indent=indent, separators=(',', ': '))
+
+
+def test_integers_wider_than_64_bits_are_encoded():
+    value = {'big': 2 ** 70, 'small': -2 ** 70}
+    assert json.loads(encode_json_compact(value)) == value
+    assert json.loads(CodecRegistry(indent=2).encode_json(value)) == value
+
+
+def test_unsupported_objects_are_rejected():
+    with pytest.raises(UnexpectedResponseType):
+        encode_json_compact({'a': object()}, jsondict_default())
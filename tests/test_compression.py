@@ -0,0 +1,87 @@
+import gzip
+import zlib
+
+from east import JSON, JSONLines
+from east.compression import Compressor, negotiate_encoding
+from east.http import Response
+from east.ext.cache import ResponseCache
+
+from conftest import call, new_app
+
+
+def make_app(**config):
+    app = new_app(**dict({'COMPRESSION': True, 'COMPRESSION_MIN_SIZE': 100}, **config))
+    cache = ResponseCache()
+    app.register_extension(cache, 'cache')
+
+    @app.route('/cached')
+    @cache.cached(ttl=60)
+    def cached() -> JSON:
+        return ['item'] * 100
+
+    return app
+
+
+def test_compressed_response_etag_differs_from_identity():
+    app = make_app()
+    _, identity, identity_body = call(app, '/cached')
+    _, compressed, compressed_body = call(app, '/cached', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in identity and compressed['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed_body) == identity_body
+    assert compressed['ETag'] == 'W/' + identity['ETag']
+
+    status, _, _ = call(app, '/cached', headers={'Accept-Encoding': 'gzip', 'If-None-Match': compressed['ETag']})
+    assert status == 304
+    status, _, _ = call(app, '/cached', headers={'If-None-Match': identity['ETag']})
+    assert status == 304
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding(None) is None
+    assert negotiate_encoding('identity') is None
+    assert negotiate_encoding('gzip, deflate') == 'gzip'
+    assert negotiate_encoding('deflate, gzip') == 'gzip'
+    assert negotiate_encoding('gzip;q=0.5, deflate;q=0.8') == 'deflate'
+    assert negotiate_encoding('gzip;q=0, deflate') == 'deflate'
+    assert negotiate_encoding('gzip;q=0') is None
+    assert negotiate_encoding('*') == 'gzip'
+    assert negotiate_encoding('br, gzip;q=bad, deflate;q=0.1') == 'deflate'
+
+
+def test_small_bodies_and_incompressible_types_are_left_alone():
+    compressor = Compressor(min_size=100)
+    small = compressor.compress(Response(b'x' * 99), 'gzip')
+    image = compressor.compress(Response(b'x' * 1000, content_type='image/png'), 'gzip')
+    ranged = compressor.compress(Response(b'x' * 1000, headers={'Accept-Ranges': 'bytes'}), 'gzip')
+
+    for response in (small, image, ranged):
+        assert 'Content-Encoding' not in response.headers and 'Vary' not in response.headers
+        assert response.body.startswith(b'x')
+
+
+def test_vary_is_set_even_when_the_client_accepts_no_encoding():
+    response = Compressor(min_size=100).compress(Response(b'x' * 1000), 'gzip;q=0')
+    assert response.body == b'x' * 1000
+    assert 'Content-Encoding' not in response.headers
+    assert response.headers['Vary'] == ['Accept-Encoding']
+
+
+def test_deflate_body_and_content_length():
+    response = Compressor(min_size=100).compress(Response('x' * 1000), 'deflate')
+    assert response.headers['Content-Encoding'] == ['deflate']
+    assert response.headers['Content-Length'] == [str(len(response.body))]
+    assert zlib.decompress(response.body) == b'x' * 1000
+
+
+def test_streamed_responses_are_compressed_incrementally():
+    app = make_app()
+
+    @app.route('/stream')
+    def stream() -> JSONLines:
+        return ({'line': i} for i in range(1000))
+
+    status, headers, body = call(app, '/stream', headers={'Accept-Encoding': 'gzip'})
+    assert status == 200
+    assert headers['Content-Encoding'] == 'gzip' and 'Content-Length' not in headers
+    assert gzip.decompress(body) == b''.join(b'{"line":%d}\n' % i for i in range(1000))
@@ -0,0 +1,43 @@
+import os
+
+from east import File, Resource
+
+from conftest import call, new_app
+
+
+def make_app(directory):
+    app = new_app()
+
+    @app.route('/files/<string:name>')
+    def files(name: str) -> File(stat_ttl=60):
+        return os.path.join(directory, name)
+
+    @app.resource('/report')
+    class Report(Resource):
+        def get(self) -> File:
+            return os.path.join(directory, 'report.txt')
+
+    return app
+
+
+def test_file_changed_since_stat_is_sent_whole(tmp_path):
+    app = make_app(tmp_path)
+    (tmp_path / 'data.txt').write_bytes(b'x' * 100)
+    assert call(app, '/files/data.txt')[2] == b'x' * 100
+
+    (tmp_path / 'data.txt').write_bytes(b'y' * 300)
+    status, headers, body = call(app, '/files/data.txt')
+    assert status == 200
+    assert headers['Content-Length'] == '300'
+    assert body == b'y' * 300
+
+
+def test_head_requests_get_headers_only(tmp_path):
+    app = make_app(tmp_path)
+    (tmp_path / 'data.txt').write_bytes(b'x' * 100)
+    (tmp_path / 'report.txt').write_bytes(b'r' * 10)
+
+    status, headers, body = call(app, '/files/data.txt', 'HEAD')
+    assert (status, headers['Content-Length'], body) == (200, '100', b'')
+    status, headers, body = call(app, '/report', 'HEAD')
+    assert (status, headers['Content-Length'], body) == (200, '10', b'')
@@ -0,0 +1,70 @@
+import time
+
+from east import JSON
+from east.ext.cache import ResponseCache
+from east.ext.jwt import JWT
+
+from conftest import call, new_app
+
+
+def make_app():
+    app = new_app()
+    jwt = JWT('secret')
+    app.register_extension(jwt, 'jwt')
+    seen = []
+
+    @app.route('/me')
+    @jwt.required
+    def me() -> JSON:
+        return 'ok'
+
+    @app.event_hook('endpoint_determined', endpoint=me)
+    def tamper(context):
+        seen.append(context.claims.get('sub'))
+        context.claims['sub'] = 'someone else'
+
+    return app, jwt, seen
+
+
+def call_with_token(app, token):
+    return call(app, '/me', headers={'Authorization': 'Bearer ' + token})[0]
+
+
+def test_numeric_string_expiration_is_accepted():
+    app, jwt, _ = make_app()
+    token = jwt.encode({'sub': 'user', 'exp': str(int(time.time()) + 60)})
+    assert [call_with_token(app, token) for _ in range(2)] == [200, 200]
+
+
+def test_expired_token_is_rejected():
+    app, jwt, _ = make_app()
+    token = jwt.encode({'sub': 'user', 'exp': str(int(time.time()) - 60)})
+    assert call_with_token(app, token) == 401
+
+
+def test_cached_claims_are_not_changed_by_requests():
+    app, jwt, seen = make_app()
+    token = jwt.encode({'sub': 'user', 'exp': time.time() + 60})
+    call_with_token(app, token)
+    call_with_token(app, token)
+    assert seen == ['user', 'user']
+
+
+def test_cached_responses_of_protected_endpoints_require_a_token():
+    app = new_app()
+    jwt = JWT('secret')
+    cache = ResponseCache()
+    app.register_extension(jwt, 'jwt')
+    app.register_extension(cache, 'cache')
+
+    @app.route('/secret')
+    @jwt.required
+    @cache.cached(ttl=60)
+    def secret() -> JSON:
+        return 'protected'
+
+    token = jwt.encode({'sub': 'user', 'exp': time.time() + 60})
+    assert call(app, '/secret', headers={'Authorization': 'Bearer ' + token})[:3:2] == (200, b'"protected"')
+    assert call(app, '/secret', headers={'Authorization': 'Bearer ' + token})[0] == 200
+    assert call(app, '/secret')[0] == 401
+    assert call(app, '/secret', headers={'Authorization': 'Bearer garbage'})[0] == 401
@@ -0,0 +1,56 @@
+import time
+
+from east import JSON, Str
+
+from conftest import call, new_app
+
+
+def make_app():
+    app = new_app(METRICS=True)
+
+    @app.route('/stream')
+    def stream() -> Str:
+        return (chunk for chunk in ('héllo', ' ', 'world'))
+
+    @app.route('/plain')
+    def plain() -> JSON:
+        return 'ok'
+
+    return app
+
+
+def route_metrics(app):
+    return {(item['route'], item['method']): item for item in app.metrics.snapshot()['routes']}
+
+
+def test_streamed_response_bytes_are_counted_as_sent():
+    app = make_app()
+    assert call(app, '/stream')[2] == 'héllo world'.encode('utf8')
+    metrics = route_metrics(app)[('/stream', 'GET')]
+    assert metrics['count'] == 1
+    assert metrics['response_bytes'] == len('héllo world'.encode('utf8'))
+    assert app.metrics.in_flight == 0
+
+
+def test_unknown_methods_are_recorded_as_other():
+    app = make_app()
+    for method in ('GET', 'BREW', 'FOO'):
+        call(app, '/plain', method)
+    assert sorted(method for _, method in route_metrics(app)) == ['GET', 'OTHER']
+
+
+def test_lazy_parameter_parsing_is_timed_as_parse():
+    app = make_app()
+
+    def slow_int(value):
+        time.sleep(0.05)
+        return int(value)
+
+    @app.route('/items', methods=['POST'])
+    def items(count: slow_int) -> JSON:
+        return count
+
+    assert call(app, '/items', 'POST', b'{"count": 3}', 'application/json')[::2] == (200, b'3')
+    phases = route_metrics(app)[('/items', 'POST')]['phases']
+    assert phases['parse'] >= 0.05
+    assert 0 <= phases['dispatch'] < 0.05
@@ -0,0 +1,106 @@
+import os
+import random
+
+import pytest
+
+from east import JSON
+from east.exceptions import RequestParseError
+from east.multipart import MultipartParser, UploadedFile
+
+from conftest import call, new_app
+
+
+BOUNDARY = 'XyZ-boundary'
+UPLOAD = os.urandom(3000) + b'\r\n--XyZ-bound' + os.urandom(3000)
+
+
+def part(name, value, filename=None, content_type=None):
+    disposition = 'form-data; name="%s"' % name + ('; filename="%s"' % filename if filename else '')
+    headers = 'Content-Disposition: %s\r\n' % disposition
+    if content_type:
+        headers += 'Content-Type: %s\r\n' % content_type
+    return b'--' + BOUNDARY.encode() + b'\r\n' + headers.encode() + b'\r\n' + value + b'\r\n'
+
+
+BODY = (b'preamble\r\n' + part('title', 'Hello, wörld'.encode('utf8')) + part('tag', b'a') + part('tag', b'b')
+        + part('upload', UPLOAD, 'data.bin', 'application/octet-stream') + part('empty', b'')
+        + b'--' + BOUNDARY.encode() + b'--\r\nepilogue')
+
+
+def parse(chunks, spool_size=1024):
+    parser = MultipartParser(BOUNDARY, spool_size=spool_size)
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.close()
+
+
+def split(body, positions):
+    positions = sorted(set(positions))
+    return [body[start:end] for start, end in zip([0] + positions, positions + [len(body)])]
+
+
+def check_fields(fields):
+    assert fields['title'] == 'Hello, wörld'
+    assert fields['tag'] == ['a', 'b']
+    assert fields['empty'] == ''
+    upload = fields['upload']
+    assert isinstance(upload, UploadedFile)
+    assert (upload.filename, upload.content_type, upload.size) == ('data.bin', 'application/octet-stream',
+                                                                   len(UPLOAD))
+    assert upload.read() == UPLOAD
+
+
+def test_whole_body():
+    check_fields(parse([BODY]))
+
+
+def test_byte_by_byte():
+    check_fields(parse([BODY[i:i + 1] for i in range(len(BODY))]))
+
+
+def test_split_across_every_delimiter():
+    delimiter = b'\r\n--' + BOUNDARY.encode()
+    starts = [i for i in range(len(BODY)) if BODY.startswith(delimiter, i)]
+    for offset in range(len(delimiter) + 1):
+        check_fields(parse(split(BODY, [start + offset for start in starts])))
+
+
+def test_random_chunk_boundaries():
+    rng = random.Random(5)
+    for _ in range(200):
+        check_fields(parse(split(BODY, [rng.randrange(len(BODY)) for _ in range(rng.randint(1, 20))])))
+
+
+def test_large_uploads_are_spooled_to_disk():
+    upload = parse([BODY], spool_size=1024)['upload']
+    assert upload.file._rolled
+    upload = parse([BODY], spool_size=len(UPLOAD) + 1)['upload']
+    assert not upload.file._rolled
+
+
+@pytest.mark.parametrize('length', [0, 20, len(BODY) // 2, len(BODY) - 20])
+def test_truncated_body_is_rejected(length):
+    with pytest.raises(RequestParseError):
+        parse([BODY[:length]])
+
+
+def test_malformed_delimiter_is_rejected():
+    with pytest.raises(RequestParseError):
+        parse([BODY.replace(b'--' + BOUNDARY.encode() + b'\r\nContent', b'--' + BOUNDARY.encode() + b'XXContent', 1)])
+
+
+def test_missing_boundary_is_rejected():
+    with pytest.raises(RequestParseError):
+        MultipartParser('')
+
+
+def test_multipart_request():
+    app = new_app()
+
+    @app.route('/upload', methods=['POST'])
+    def upload(title: str, tag: list) -> JSON:
+        return {'title': title, 'tags': tag}
+
+    status, _, body = call(app, '/upload', 'POST', BODY, 'multipart/form-data; boundary=%s' % BOUNDARY)
+    assert status == 200
+    assert body.decode('utf8') == '{"title":"Hello, wörld","tags":["a","b"]}'
@@ -0,0 +1,39 @@
+import threading
+
+from east import JSON
+
+from conftest import call_asgi, make_environ, new_app
+
+
+def test_concurrent_requests_are_profiled_one_at_a_time():
+    app = new_app(PROFILING=True, PROFILING_SAMPLE_RATE=1.0, THREAD_POOL_SIZE=4)
+    barrier = threading.Barrier(4, timeout=5)
+
+    @app.route('/slow')
+    def slow() -> JSON:
+        barrier.wait()
+        return 'ok'
+
+    statuses = []
+    threads = [threading.Thread(target=lambda: statuses.append(app.handle_request(make_environ('/slow')).status))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses == [200] * 4
+    assert app.profiler.counts == {('/slow', 'GET'): 1}
+
+
+def test_sync_endpoints_are_profiled_under_asgi():
+    app = new_app(PROFILING=True, PROFILING_SAMPLE_RATE=1.0)
+
+    @app.route('/work')
+    def work() -> JSON:
+        return sorted(range(1000), key=lambda x: -x)[:3]
+
+    assert call_asgi(app, '/work')[0] == 200
+    report = app.profiler.report()
+    assert 'GET /work, 1 requests' in report
+    assert '(work)' in app.profiler.report(limit=None)
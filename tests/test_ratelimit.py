@@ -0,0 +1,53 @@
+import json
+
+from east import JSON
+from east.ext.cache import ResponseCache
+from east.ext.ratelimit import RateLimiter
+
+from conftest import call, new_app
+
+
+def make_app(**config):
+    app = new_app(**config)
+    limiter = RateLimiter(rate=1, burst=1)
+    app.register_extension(limiter)
+    return app, limiter
+
+
+def test_rate_limit_applies_to_cached_endpoints():
+    app, limiter = make_app()
+    cache = ResponseCache()
+    app.register_extension(cache)
+    calls = []
+
+    @app.route('/cached')
+    @cache.cached(ttl=60)
+    def cached() -> JSON:
+        calls.append(1)
+        return 'ok'
+
+    statuses = [call(app, '/cached')[0] for _ in range(5)]
+    assert statuses == [200, 429, 429, 429, 429]
+    assert limiter.rejected == 4
+    assert len(calls) == 1
+
+    status, headers, _ = call(app, '/cached')
+    assert status == 429 and headers['Retry-After'] == '1'
+
+
+def test_rate_limit_applies_to_batch_requests():
+    app, limiter = make_app(BATCH_ENDPOINT='/batch')
+    calls = []
+
+    @app.route('/item')
+    def item() -> JSON:
+        calls.append(1)
+        return 'ok'
+
+    batch = b'[{"path": "/item"}, {"path": "/item"}]'
+    status, _, body = call(app, '/batch', 'POST', batch, 'application/json')
+    assert status == 200
+    assert [result['status'] for result in json.loads(body)] == [200, 429]
+
+    assert call(app, '/batch', 'POST', batch, 'application/json')[0] == 429
+    assert len(calls) == 1
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+from east import JSON, Resource
+
+from conftest import asgi_request, asgi_response, call, call_asgi, make_scope, new_app
+
+
+def test_thread_lifecycle_instance_is_unique_per_thread_under_asgi():
+    app = new_app(THREAD_POOL_SIZE=5)
+    barrier = threading.Barrier(5, timeout=5)
+    used = []
+
+    @app.resource('/item')
+    class Item(Resource):
+        lifecycle = 'thread'
+
+        def get(self) -> JSON:
+            barrier.wait()
+            used.append((threading.get_ident(), id(self)))
+            return 'ok'
+
+    async def main():
+        return await asyncio.gather(*[asgi_request(app, make_scope('/item'), []) for _ in range(5)])
+
+    assert [asgi_response(sent)[0] for sent in asyncio.run(main())] == [200] * 5
+    assert len({thread for thread, _ in used}) == 5
+    assert len({instance for _, instance in used}) == 5
+
+
+def test_unsupported_method_gets_allow_header_under_asgi():
+    app = new_app()
+
+    @app.resource('/item')
+    class Item(Resource):
+        def put(self) -> JSON:
+            return 'ok'
+
+    status, headers, _ = call_asgi(app, '/item')
+    assert status == 405
+    assert headers['Allow'] == 'PUT'
+
+
+def test_overridden_call_is_used_under_wsgi_and_asgi():
+    app = new_app()
+    calls = []
+
+    @app.resource('/item')
+    class Item(Resource):
+        def __call__(self, context):
+            calls.append(context.request.method)
+            return super().__call__(context)
+
+        def get(self) -> JSON:
+            return 'ok'
+
+    assert call(app, '/item')[::2] == (200, b'"ok"')
+    assert call_asgi(app, '/item')[::2] == (200, b'"ok"')
+    assert call_asgi(app, '/item', 'DELETE')[0] == 405
+    assert calls == ['GET', 'GET', 'DELETE']
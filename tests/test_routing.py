@@ -0,0 +1,102 @@
+import random
+import re
+
+import pytest
+
+from east import JSON
+from east.exceptions import HTTPNotFound
+from east.routing import Route, Router
+
+
+RULES = [
+    ('/', ['GET']),
+    ('/users', ['GET', 'POST']),
+    ('/users/<int:user_id>', ['GET']),
+    ('/users/<string:name>', ['GET', 'DELETE']),
+    ('/users/me', ['GET']),
+    ('/users/<int:user_id>/posts/<int:post_id>', ['GET']),
+    ('/api/v<int:version>/items', ['GET']),
+    ('/api/v<int:version>/<string:kind>', ['GET']),
+    ('/files/<path:file_path>.txt', ['GET']),
+    ('/files/<path:file_path>', ['GET', 'PUT']),
+    ('/static/<path:rest>', ['GET', 'POST', 'PUT', 'PATCH']),
+    ('/a-<string:x>-<string:y>', ['GET']),
+    ('/<string:section>/index', ['POST']),
+]
+
+URLS = ['/', '/users', '/users/', '/users/42', '/users/me', '/users/bob', '/users/42/posts/7', '/users/x/posts/7',
+        '/api/v2/items', '/api/v2/things', '/api/vx/items', '/api/v/items', '/files/a.txt', '/files/a/b/c.txt',
+        '/files/a/b/c', '/files/.txt', '/files/', '/static/css/site.css', '/static', '/a-b-c', '/a-b', '/a--c',
+        '/users/index', '/x/index', '/nope', '/users/42/posts', '//users']
+METHODS = ['GET', 'POST', 'PUT', 'DELETE', 'PATCH']
+
+
+def make_router(rules, cache_size=None):
+    router = Router(cache_size)
+    for rule, methods in rules:
+        def endpoint() -> JSON:
+            pass
+        router.add_route(endpoint, rule, methods)
+    return router
+
+
+def reference_resolve(rules, url, method):
+    """Resolution of the former router: the first registered route whose regex
+    matches the whole URL and which accepts the method"""
+    for index, (rule, methods) in enumerate(rules):
+        regex, parameter_types = Route.make_regex(rule)
+        match = re.fullmatch(regex, url)
+        if match is not None and method in methods:
+            return index, {name: Route._type_parsers[parameter_types[name]](value)
+                           for name, value in match.groupdict().items()}
+    return None
+
+
+def resolve(router, url, method):
+    try:
+        route, url_parameters = router.resolve(url, method)
+    except HTTPNotFound:
+        return None
+    return router.routes.index(route), url_parameters
+
+
+@pytest.mark.parametrize('cache_size', [None, 16])
+def test_trie_matches_regex_semantics(cache_size):
+    router = make_router(RULES, cache_size)
+    for url in URLS:
+        for method in METHODS:
+            assert resolve(router, url, method) == reference_resolve(RULES, url, method), (method, url)
+
+
+def test_first_registered_route_wins():
+    rules = [('/items/<string:name>', ['GET']), ('/items/new', ['GET']), ('/items/<int:item_id>', ['GET'])]
+    router = make_router(rules)
+    assert resolve(router, '/items/new', 'GET') == (0, {'name': 'new'})
+    assert resolve(router, '/items/5', 'GET') == (0, {'name': '5'})
+
+
+def test_parameters_are_converted():
+    router = make_router(RULES)
+    assert resolve(router, '/users/42/posts/7', 'GET') == (5, {'user_id': 42, 'post_id': 7})
+    assert resolve(router, '/api/v3/items', 'GET') == (6, {'version': 3})
+    assert resolve(router, '/files/a/b.txt', 'GET') == (8, {'file_path': 'a/b'})
+
+
+def test_methods_are_filtered():
+    router = make_router(RULES)
+    assert resolve(router, '/users/42', 'DELETE') == (3, {'name': '42'})
+    assert resolve(router, '/files/a/b.txt', 'PUT') == (9, {'file_path': 'a/b.txt'})
+    assert resolve(router, '/users/42', 'PATCH') is None
+    assert resolve(router, '/static/x', 'PATCH') == (10, {'rest': 'x'})
+    assert resolve(router, '/static/x', 'DELETE') is None
+
+
+def test_random_urls_match_regex_semantics():
+    router = make_router(RULES)
+    rng = random.Random(1)
+    parts = ['users', 'me', '42', 'x', 'posts', 'api', 'v1', 'vx', 'items', 'files', 'a.txt', 'static', 'a-b-c',
+             'index', '']
+    for _ in range(2000):
+        url = '/' + '/'.join(rng.choice(parts) for _ in range(rng.randint(0, 5)))
+        method = rng.choice(METHODS)
+        assert resolve(router, url, method) == reference_resolve(RULES, url, method), (method, url)
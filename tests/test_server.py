@@ -0,0 +1,56 @@
+import http.client
+import threading
+import time
+
+from east import Str
+from east.server import StdlibBackend, bind_socket
+
+from conftest import new_app
+
+
+def start_backend(delay):
+    app = new_app()
+
+    @app.route('/slow')
+    def slow() -> Str:
+        time.sleep(delay)
+        return 'done'
+
+    backend = StdlibBackend(app, bind_socket('127.0.0.1', 0), app.logger)
+    backend.start()
+    return backend
+
+
+def request_in_background(backend):
+    results = []
+
+    def run():
+        connection = http.client.HTTPConnection(*backend.server.server_address[:2], timeout=10)
+        try:
+            connection.request('GET', '/slow')
+            results.append(connection.getresponse().status)
+        except OSError as e:
+            results.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    while not backend.server.request_threads:
+        time.sleep(0.01)
+    return thread, results
+
+
+def test_stop_waits_for_in_flight_requests():
+    backend = start_backend(0.3)
+    thread, results = request_in_background(backend)
+    backend.stop(5)
+    thread.join(5)
+    assert results == [200]
+
+
+def test_stop_gives_up_after_the_timeout():
+    backend = start_backend(3)
+    request_in_background(backend)
+    started = time.monotonic()
+    backend.stop(0.2)
+    assert time.monotonic() - started < 1
+    assert len(backend.server.request_threads) == 1